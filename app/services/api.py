@@ -92,6 +92,13 @@ def get_course_status(user: str, course: str):
     data = handle_response(res)
     return data.get("remaining", 0)
 
+def get_course_progress(user: str, course: str):
+    res = requests.get(f"{FASTAPI_URL}/course_status", params={"user": user, "course": course})
+    data = handle_response(res)
+    if isinstance(data, dict) and data.get("error"):
+        return data
+    return data.get("files", [])
+
 def generate_rag_answer(user, course, session_id, question):
     url = f"{FASTAPI_URL}/chat/answer"
     payload = {
@@ -103,6 +110,30 @@ def generate_rag_answer(user, course, session_id, question):
     res = requests.post(url, json=payload)
     return handle_response(res)
 
+def stream_rag_answer(user, course, session_id, question):
+    url = f"{FASTAPI_URL}/chat/answer/stream"
+    payload = {
+        "user": user,
+        "course": course,
+        "session_id": session_id,
+        "question": question,
+    }
+    try:
+        with requests.post(url, json=payload, stream=True) as res:
+            if res.status_code != 200:
+                yield "error", {"message": f"오류: {res.status_code}"}
+                return
+            res.encoding = "utf-8"
+            event = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event:
+                    yield event, json.loads(line[len("data: "):])
+                    event = None
+    except requests.RequestException as e:
+        yield "error", {"message": f"오류: {e}"}
+
 def create_session(user, course):
     payload = {"user": user, "course": course}
     res = requests.post(f"{FASTAPI_URL}/chat/session", json=payload)
@@ -132,8 +163,23 @@ def update_chat_log(user, course, session_id, role, message):
     res = requests.post(f"{FASTAPI_URL}/chat/log", json=payload)
     return handle_response(res)
 
-def get_chat_log(user, course, session_id):
-    res = requests.get(f"{FASTAPI_URL}/chat/log", params={
+def get_chat_log(user, course, session_id, since=None, limit=None, include_context=True):
+    params = {
+        "user": user,
+        "course": course,
+        "session_id": session_id,
+        "include_context": include_context,
+    }
+    if since is not None:
+        params["since"] = since
+    if limit is not None:
+        params["limit"] = limit
+    res = requests.get(f"{FASTAPI_URL}/chat/log", params=params)
+    data = handle_response(res)
+    return data.get("data", []) if isinstance(data, dict) else data
+
+def get_chat_context(user, course, session_id, log_id):
+    res = requests.get(f"{FASTAPI_URL}/chat/log/{log_id}/context", params={
         "user": user,
         "course": course,
         "session_id": session_id,
@@ -1,17 +1,116 @@
 # app/ui/chat.py
 
-import time
 import streamlit as st
 from services.api import (
     list_courses,
     list_sessions,
     create_session,
     delete_session,
-    generate_rag_answer,
+    stream_rag_answer,
     get_chat_log,
-    get_course_status
+    get_chat_context,
+    get_course_status,
+    get_course_progress
 )
 
+JOB_STATE_LABELS = {
+    "queued": "대기 중",
+    "parsing": "문서 분석 중",
+    "embedding": "임베딩 중",
+    "done": "완료",
+    "failed": "실패",
+}
+
+TITLE_POLL_INTERVAL = 3
+INGEST_POLL_INTERVAL = 3
+CHAT_LOG_PAGE_SIZE = 200
+PLACEHOLDER_TITLE = "(새 세션)"
+
+
+def session_list(username, course):
+    sessions = list_sessions(username, course)
+    if isinstance(sessions, dict) and sessions.get("error"):
+        st.error(sessions["error"])
+        return
+
+    for session in sessions:
+        session_id = session["session_id"]
+        title = session["title"]
+        cols = st.columns([6, 1])
+        with cols[0]:
+            if st.button(title, key=f"load_{session_id}"):
+                if st.session_state.get("session_id") != session_id:
+                    st.session_state["session_id"] = session_id
+                    st.session_state.pop("chat_messages", None)
+                    st.session_state.pop("chat_loaded_for", None)
+                    st.rerun()
+        with cols[1]:
+            if st.button("🗑️", key=f"del_{session_id}"):
+                delete_session(username, course, session_id)
+                if st.session_state.get("session_id") == session_id:
+                    st.session_state.pop("session_id", None)
+                    st.session_state.pop("chat_messages", None)
+                    st.session_state.pop("chat_loaded_for", None)
+                st.rerun()
+
+    # 첫 답변 뒤 세션 제목은 서버에서 늦게 만들어지므로, 제목이 정해질 때까지만 목록을 주기적으로 갱신
+    current = next((s for s in sessions if s["session_id"] == st.session_state.get("session_id")), None)
+    pending = bool(current and current["title"] == PLACEHOLDER_TITLE and st.session_state.get("chat_messages"))
+    if pending != st.session_state.get("title_pending", False):
+        st.session_state["title_pending"] = pending
+        st.rerun()
+
+
+def ingest_progress(username, course):
+    remaining = get_course_status(username, course)
+    if isinstance(remaining, dict) and remaining.get("error"):
+        st.error(remaining["error"])
+        return
+
+    # 반영이 끝날 때까지 진행 상황만 주기적으로 갱신하고, 질문은 이전 버전의 인덱스로 계속 받음
+    pending = remaining > 0
+    if pending != st.session_state.get("ingest_pending", False):
+        st.session_state["ingest_pending"] = pending
+        st.rerun()
+    if not pending:
+        return
+
+    st.info(f"⚙️ '{course}' 과목에 새 강의자료를 반영하는 중입니다. 반영이 끝나기 전까지는 기존 자료로 답변합니다.")
+    progress = get_course_progress(username, course)
+    if isinstance(progress, list):
+        for job in progress:
+            if job["state"] == "done":
+                continue
+            label = JOB_STATE_LABELS.get(job["state"], job["state"])
+            if job["state"] == "embedding" and job["chunks_total"]:
+                label += f" ({job['chunks_done']}/{job['chunks_total']} chunk)"
+            elif job["pages_total"]:
+                label += f" ({job['pages_done']}/{job['pages_total']}쪽)"
+            if job["state"] == "failed" and job.get("error"):
+                label += f" - {job['error']}"
+            st.markdown(f"- 📄 {job['filename']}: {label}")
+
+
+def fetch_messages(username, course, session_id, since=None, include_context=False):
+    messages = []
+    while True:
+        page = get_chat_log(username, course, session_id, since=since, limit=CHAT_LOG_PAGE_SIZE, include_context=include_context)
+        if isinstance(page, dict) and page.get("error"):
+            return page
+        if not page:
+            return messages
+        messages.extend(page)
+        if len(page) < CHAT_LOG_PAGE_SIZE:
+            return messages
+        since = page[-1]["id"]
+
+
+def render_sources(docs):
+    for i, doc in enumerate(docs):
+        st.markdown(f"**[{i+1}] {doc['metadata'].get('source', '알 수 없음')}**")
+        st.code(doc["page_content"][:500])
+
+
 def chat_page():
     username = st.session_state.get("username", "anonymous")
     all_courses = list_courses(username)
@@ -49,43 +148,13 @@ def chat_page():
                     st.session_state["chat_loaded_for"] = new_session_id
                     st.rerun()
 
-        sessions = list_sessions(username, course)
-        if isinstance(sessions, dict) and sessions.get("error"):
-            st.error(sessions["error"])
-            return
-
-        for session in sessions:
-            session_id = session["session_id"]
-            title = session["title"]
-            cols = st.columns([6, 1])
-            with cols[0]:
-                if st.button(title, key=f"load_{session_id}"):
-                    if st.session_state.get("session_id") != session_id:
-                        st.session_state["session_id"] = session_id
-                        st.session_state.pop("chat_messages", None)
-                        st.session_state.pop("chat_loaded_for", None)
-                        st.rerun()
-            with cols[1]:
-                if st.button("🗑️", key=f"del_{session_id}"):
-                    delete_session(username, course, session_id)
-                    if st.session_state.get("session_id") == session_id:
-                        st.session_state.pop("session_id", None)
-                        st.session_state.pop("chat_messages", None)
-                        st.session_state.pop("chat_loaded_for", None)
-                    st.rerun()
+        run_every = TITLE_POLL_INTERVAL if st.session_state.get("title_pending") else None
+        st.fragment(run_every=run_every)(session_list)(username, course)
 
     st.markdown("# 💬 강의자료 Q&A")
 
-    remaining = get_course_status(username, course)
-    if isinstance(remaining, dict) and remaining.get("error"):
-        st.error(remaining["error"])
-        return
-    if remaining > 0:
-        placeholder = st.empty()
-        with placeholder.container():
-            st.warning(f"⚙️ '{course}' 과목 벡터 DB 정리 중입니다. 잠시만 기다려주세요...")
-        time.sleep(3)
-        st.rerun()
+    run_every = INGEST_POLL_INTERVAL if st.session_state.get("ingest_pending") else None
+    st.fragment(run_every=run_every)(ingest_progress)(username, course)
 
     if "session_id" not in st.session_state:
         st.session_state["session_id"] = None
@@ -97,7 +166,8 @@ def chat_page():
     if session_id:
         loaded_for = st.session_state.get("chat_loaded_for")
         if loaded_for != session_id:
-            logs = get_chat_log(username, course, session_id)
+            # 긴 세션도 가볍게 열리도록 출처(context)는 빼고 받고, 펼칠 때 메시지별로 불러옴
+            logs = fetch_messages(username, course, session_id)
             if isinstance(logs, dict) and logs.get("error"):
                 st.error(logs["error"])
                 return
@@ -107,11 +177,16 @@ def chat_page():
     for msg in st.session_state.chat_messages:
         with st.chat_message(msg["role"]):
             st.markdown(msg["message"])
-            if msg["role"] == "assistant" and msg.get("context"):
+            if msg["role"] == "assistant" and (msg.get("context") or msg.get("has_context")):
                 with st.expander("🔍 출처 보기"):
-                    for i, doc in enumerate(msg["context"]):
-                        st.markdown(f"**[{i+1}] {doc['metadata'].get('source', '알 수 없음')}**")
-                        st.code(doc["page_content"][:500])
+                    if msg.get("context") is None and st.button("출처 불러오기", key=f"context_{msg['id']}"):
+                        context = get_chat_context(username, course, session_id, msg["id"])
+                        if isinstance(context, dict) and context.get("error"):
+                            st.error(context["error"])
+                        else:
+                            msg["context"] = context
+                    if msg.get("context"):
+                        render_sources(msg["context"])
 
     user_input = st.chat_input("질문을 입력하세요")
     if user_input:
@@ -128,26 +203,34 @@ def chat_page():
             st.markdown(user_input)
 
         with st.chat_message("assistant"):
-            with st.spinner("답변 생성 중..."):
-                response = generate_rag_answer(username, course, session_id, user_input)
-                if isinstance(response, dict) and response.get("error"):
-                    st.error(response["error"])
-                    return
-                answer = response.get("answer") or response.get("data", {}).get("answer", "")
-                sources = response.get("context") or response.get("data", {}).get("context", [])
-                st.markdown(answer)
-
-        logs = get_chat_log(username, course, session_id)
+            sources = []
+            errors = []
+
+            def answer_tokens():
+                for event, data in stream_rag_answer(username, course, session_id, user_input):
+                    if event == "sources":
+                        sources.extend(data.get("context", []))
+                    elif event == "token":
+                        yield data["text"]
+                    elif event == "error":
+                        errors.append(data.get("message", "응답 생성 실패"))
+
+            st.write_stream(answer_tokens())
+            if errors:
+                st.error(errors[0])
+                return
+
+        messages = st.session_state.get("chat_messages") or []
+        since = messages[-1]["id"] if messages else None
+        logs = fetch_messages(username, course, session_id, since=since, include_context=True)
         if isinstance(logs, dict) and logs.get("error"):
             st.error(logs["error"])
         else:
-            st.session_state["chat_messages"] = logs
+            st.session_state["chat_messages"] = messages + logs
             st.session_state["chat_loaded_for"] = session_id
 
             if sources:
                 with st.expander("🔍 출처 보기"):
-                    for i, doc in enumerate(sources):
-                        st.markdown(f"**[{i+1}] {doc['metadata'].get('source', '알 수 없음')}**")
-                        st.code(doc["page_content"][:500])
+                    render_sources(sources)
 
         st.rerun()
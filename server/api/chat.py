@@ -1,17 +1,23 @@
 # server/api/chat.py
 
+import os
 import json
 import uuid
+import asyncio
 from pathlib import Path
 from datetime import datetime
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import select, or_, and_
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, AsyncSessionLocal
 from models.chat import ChatLog, SessionTitle
-from core.rag_agent import get_or_create_graph
+from core.rag_agent import aget_or_create_graph
+from core.checkpoints import register_thread, delete_checkpoints
 from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import AIMessageChunk
 from langchain_openai import ChatOpenAI
 
 
@@ -19,6 +25,17 @@ router = APIRouter()
 
 SESSION_DIR = Path("data/sessions")
 
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+
+# 동시에 LLM/검색을 돌리는 요청 수 상한. 넘치는 요청은 이벤트 루프를 막지 않고 대기함
+chat_semaphore = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
+PLACEHOLDER_TITLE = "(새 세션)"
+TITLE_FALLBACK_CHARS = 30
+
+CHAT_LOG_PAGE_LIMIT = 200
+CHAT_LOG_MAX_LIMIT = 1000
+
 
 class RagRequest(BaseModel):
     user: str
@@ -41,44 +58,131 @@ class ChatLogRequest(BaseModel):
     message: str
 
 
-@router.post("/chat/answer")
-def generate_rag_answer(req: RagRequest, db: Session = Depends(get_db)):
+def serialize_context(docs) -> list[dict]:
+    return [
+        {
+            "page_content": doc.page_content,
+            "metadata": doc.metadata
+        } for doc in docs
+    ]
+
+
+async def save_chat_turn(db: AsyncSession, req: RagRequest, answer: str, serializable_context: list[dict]) -> list[int]:
+    user_log = ChatLog(user=req.user, course=req.course, session_id=req.session_id, role="user", message=req.question)
+    assistant_log = ChatLog(user=req.user, course=req.course, session_id=req.session_id, role="assistant", message=answer, context=json.dumps(serializable_context))
+    db.add(user_log)
+    db.add(assistant_log)
+    await db.commit()
+    return [user_log.id, assistant_log.id]
+
+
+def fallback_title(question: str) -> str:
+    question = " ".join(question.split())
+    if len(question) <= TITLE_FALLBACK_CHARS:
+        return question
+    return question[:TITLE_FALLBACK_CHARS].rstrip() + "…"
+
+
+def needs_title(title: SessionTitle | None) -> bool:
+    return title is not None and (title.title == PLACEHOLDER_TITLE or not title.title.strip())
+
+
+async def generate_session_title(user: str, course: str, session_id: str, question: str, answer: str):
+    # 답변 응답을 보낸 뒤 실행되는 작업. 실패해도 사용자에게 영향이 없도록 질문 앞부분으로 대체함
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(SessionTitle).filter_by(user=user, course=course, session_id=session_id))
+        if not needs_title(result.scalars().first()):
+            return
+
     try:
-        graph = get_or_create_graph(req.user, req.course, req.session_id)
-        state = graph.invoke({"input": req.question}, config={"thread_id": f"{req.user}:{req.course}:{req.session_id}"})
-        answer = state["answer"].strip()
+        summarizer = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+        prompt = PromptTemplate.from_template(
+            "다음 Q&A 내용을 바탕으로 간결한 세션 제목을 지어줘. 문장형이 아니라 짧은 문구 형태.\n\nQ: {question}\nA: {answer}"
+        )
+        title_chain = prompt | summarizer
+        result = await title_chain.ainvoke({"question": question, "answer": answer})
+        session_title = result.content.strip().strip('"').strip() or fallback_title(question)
+    except Exception as e:
+        print("세션 제목 생성 실패:", e)
+        session_title = fallback_title(question)
 
-        raw_context = state.get("context", [])
-        serializable_context = [
-            {
-                "page_content": doc.page_content,
-                "metadata": doc.metadata
-            } for doc in raw_context
-        ]
-
-        db.add(ChatLog(user=req.user, course=req.course, session_id=req.session_id, role="user", message=req.question))
-        db.add(ChatLog(user=req.user, course=req.course, session_id=req.session_id, role="assistant", message=answer, context=json.dumps(serializable_context)))
-
-        existing_title = db.query(SessionTitle).filter_by(
-            user=req.user, course=req.course, session_id=req.session_id
-        ).first()
-
-        if existing_title and (existing_title.title == "(새 세션)" or not existing_title.title.strip()):
-            summarizer = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
-            prompt = PromptTemplate.from_template(
-                "다음 Q&A 내용을 바탕으로 간결한 세션 제목을 지어줘. 문장형이 아니라 짧은 문구 형태.\n\nQ: {question}\nA: {answer}"
-            )
-            title_chain = prompt | summarizer
-            result = title_chain.invoke({"question": req.question, "answer": answer})
-            session_title = result.content.strip().strip('"').strip()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(SessionTitle).filter_by(user=user, course=course, session_id=session_id))
+        existing_title = result.scalars().first()
+        if needs_title(existing_title):
             existing_title.title = session_title
+            await db.commit()
 
-        db.commit()
+
+def thread_config(req: RagRequest) -> dict:
+    return {"configurable": {"thread_id": f"{req.user}:{req.course}:{req.session_id}"}}
+
+
+async def prepare_thread(req: RagRequest) -> dict:
+    config = thread_config(req)
+    await register_thread(req.user, req.course, req.session_id, config["configurable"]["thread_id"])
+    return config
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/answer")
+async def generate_rag_answer(req: RagRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    try:
+        graph = await aget_or_create_graph(req.user, req.course)
+        config = await prepare_thread(req)
+        async with chat_semaphore:
+            state = await graph.ainvoke({"input": req.question}, config=config)
+        answer = state["answer"].strip()
+        serializable_context = serialize_context(state.get("context", []))
+
+        await save_chat_turn(db, req, answer, serializable_context)
+        background_tasks.add_task(generate_session_title, req.user, req.course, req.session_id, req.question, answer)
         return {"status": "success", "data": {"answer": answer, "context": serializable_context}}
     except Exception as e:
         return JSONResponse(status_code=500, content={"status": "error", "message": f"응답 생성 실패: {str(e)}"})
 
 
+@router.post("/chat/answer/stream")
+async def stream_rag_answer(req: RagRequest):
+    # StreamingResponse는 본문 전송이 끝난 뒤 background를 실행하므로 스트림 안에서 작업을 등록함
+    background_tasks = BackgroundTasks()
+
+    async def event_stream():
+        try:
+            graph = await aget_or_create_graph(req.user, req.course)
+            config = await prepare_thread(req)
+            serializable_context = []
+            tokens = []
+
+            async with chat_semaphore:
+                async for mode, chunk in graph.astream({"input": req.question}, config=config, stream_mode=["updates", "messages"]):
+                    if mode == "updates" and "retrieve" in chunk:
+                        serializable_context = serialize_context(chunk["retrieve"]["context"])
+                        yield sse_event("sources", {"context": serializable_context})
+                        if chunk["retrieve"].get("cache_hit"):
+                            tokens.append(chunk["retrieve"]["answer"])
+                            yield sse_event("token", {"text": chunk["retrieve"]["answer"]})
+                    elif mode == "messages":
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") == "generate" and isinstance(message, AIMessageChunk) and message.content:
+                            tokens.append(message.content)
+                            yield sse_event("token", {"text": message.content})
+
+            state = await graph.aget_state(config)
+            answer = (state.values.get("answer") or "".join(tokens)).strip()
+            async with AsyncSessionLocal() as db:
+                log_ids = await save_chat_turn(db, req, answer, serializable_context)
+            background_tasks.add_task(generate_session_title, req.user, req.course, req.session_id, req.question, answer)
+            yield sse_event("done", {"answer": answer, "log_ids": log_ids})
+        except Exception as e:
+            yield sse_event("error", {"message": f"응답 생성 실패: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", background=background_tasks)
+
+
 @router.post("/chat/session")
 def create_session(req: SessionCreateRequest, db: Session = Depends(get_db)):
     try:
@@ -87,7 +191,7 @@ def create_session(req: SessionCreateRequest, db: Session = Depends(get_db)):
             user=req.user,
             course=req.course,
             session_id=session_id,
-            title="(새 세션)"
+            title=PLACEHOLDER_TITLE
         ))
         db.commit()
         return {"status": "success", "data": {"session_id": session_id}}
@@ -115,6 +219,7 @@ def delete_session(user: str, course: str, session_id: str, db: Session = Depend
         db.query(ChatLog).filter_by(user=user, course=course, session_id=session_id).delete()
         db.query(SessionTitle).filter_by(user=user, course=course, session_id=session_id).delete()
         db.commit()
+        delete_checkpoints(user, course, session_id)
         return {"status": "success", "message": "세션 삭제 완료"}
     except Exception as e:
         return JSONResponse(status_code=500, content={"status": "error", "message": f"세션 삭제 실패: {str(e)}"})
@@ -139,24 +244,65 @@ def update_chat_log(req: ChatLogRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/chat/log")
-def get_chat_log(user: str, course: str, session_id: str, db: Session = Depends(get_db)):
+def get_chat_log(
+    user: str,
+    course: str,
+    session_id: str,
+    since: int | None = None,
+    limit: int = CHAT_LOG_PAGE_LIMIT,
+    include_context: bool = True,
+    db: Session = Depends(get_db)
+):
     try:
+        columns = [ChatLog.id, ChatLog.role, ChatLog.message, ChatLog.timestamp]
+        if include_context:
+            columns.append(ChatLog.context)
+        else:
+            columns.append(ChatLog.context.isnot(None).label("has_context"))
+
+        query = db.query(*columns).filter_by(user=user, course=course, session_id=session_id)
+
+        if since is not None:
+            # 커서(마지막으로 받은 로그 id)의 timestamp부터 이어서 읽어 복합 인덱스 범위 탐색을 사용
+            cursor = db.query(ChatLog.timestamp).filter_by(id=since).scalar()
+            if cursor is not None:
+                query = query.filter(or_(
+                    ChatLog.timestamp > cursor,
+                    and_(ChatLog.timestamp == cursor, ChatLog.id > since),
+                ))
+            else:
+                query = query.filter(ChatLog.id > since)
+
         logs = (
-            db.query(ChatLog)
-            .filter_by(user=user, course=course, session_id=session_id)
-            .order_by(ChatLog.timestamp.asc())
+            query
+            .order_by(ChatLog.timestamp.asc(), ChatLog.id.asc())
+            .limit(max(1, min(limit, CHAT_LOG_MAX_LIMIT)))
             .all()
         )
-        return {
-            "status": "success",
-            "data": [
-                {
-                    "role": log.role,
-                    "message": log.message,
-                    "context": json.loads(log.context) if log.context else None
-                }
-                for log in logs
-            ]
-        }
+
+        data = []
+        for log in logs:
+            item = {"id": log.id, "role": log.role, "message": log.message}
+            if include_context:
+                item["context"] = json.loads(log.context) if log.context else None
+            else:
+                item["context"] = None
+                item["has_context"] = bool(log.has_context)
+            data.append(item)
+
+        return {"status": "success", "data": data}
     except Exception as e:
         return JSONResponse(status_code=500, content={"status": "error", "message": f"채팅 로그 불러오기 실패: {str(e)}"})
+
+
+@router.get("/chat/log/{log_id}/context")
+def get_chat_log_context(log_id: int, user: str, course: str, session_id: str, db: Session = Depends(get_db)):
+    try:
+        context = (
+            db.query(ChatLog.context)
+            .filter_by(id=log_id, user=user, course=course, session_id=session_id)
+            .scalar()
+        )
+        return {"status": "success", "data": json.loads(context) if context else []}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"status": "error", "message": f"출처 불러오기 실패: {str(e)}"})
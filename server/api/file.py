@@ -1,19 +1,15 @@
 # server/api/file.py
 
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 import json
 
 from api.manage import list_courses
-from core.state import mark_processing, mark_done
-from core.rag_agent import refresh_graph
+from core.jobs import enqueue_files
 from core.utils import (
-    embed_and_store_chunks,
-    remove_documents_by_source,
     save_temp_pdf,
     extract_course,
     save_pdfs,
-    parse_pdfs,
     get_first_chunk_textonly
 )
 
@@ -21,7 +17,6 @@ router = APIRouter()
 
 @router.post("/upload_pdfs")
 def upload_pdfs(
-    background_tasks: BackgroundTasks,
     files: list[UploadFile] = File(...),
     user: str = Form(...),
     course: str = Form(...),
@@ -31,21 +26,8 @@ def upload_pdfs(
         overwrite_list = json.loads(overwrite_files)
         saved_paths = save_pdfs(files, user, course)
 
-        for file in files:
-            if file.filename in overwrite_list:
-                remove_documents_by_source(user, course, file.filename)
-
-        mark_processing(user, course)
-
-        def background_embedding():
-            try:
-                refresh_graph(user, course)
-                all_chunks = parse_pdfs(saved_paths)
-                embed_and_store_chunks(user, course, all_chunks)
-            finally:
-                mark_done(user, course)
-
-        background_tasks.add_task(background_embedding)
+        # 덮어쓴 파일의 기존 chunk는 작업 처리 시 새 chunk로 교체됨
+        enqueue_files(user, course, saved_paths)
 
         return {
             "status": "success",
@@ -9,8 +9,14 @@ from fastapi import APIRouter, HTTPException, Body, BackgroundTasks, Depends
 from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
 from core.utils import remove_documents_by_source
-from core.state import get_status
-from core.rag_agent import delete_graphs_and_checkpoints_by_course
+from core.jobs import cancel_jobs, count_active_jobs, list_course_jobs
+from core.embedding_cache import embedding_model
+from core.rag_agent import (
+    delete_graphs_and_checkpoints_by_course,
+    get_graph_cache_stats,
+    get_rewrite_stats,
+    get_answer_cache_stats
+)
 from models.chat import ChatLog, SessionTitle
 from database import get_db
 
@@ -49,6 +55,7 @@ def delete_file(user: str, course: str, filename: str):
         file_path = MATERIALS_DIR / user / course / filename
         if file_path.exists():
             os.remove(file_path)
+            cancel_jobs(user, course, filename)
             remove_documents_by_source(user, course, filename)
 
             course_dir = file_path.parent
@@ -134,6 +141,8 @@ def delete_course(user: str, course: str, db: Session = Depends(get_db)):
         course_path = MATERIALS_DIR / user / course
         vectorstore_path = VECTOR_DIR / user / course
 
+        cancel_jobs(user, course)
+
         if course_path.exists():
             shutil.rmtree(course_path)
         if vectorstore_path.exists():
@@ -153,12 +162,28 @@ def delete_course(user: str, course: str, db: Session = Depends(get_db)):
 @router.get("/course_status")
 def course_status(user: str, course: str):
     try:
-        remaining = get_status(user, course)
-        return {"status": "success", "data": {"remaining": remaining}}
+        remaining = count_active_jobs(user, course)
+        return {"status": "success", "data": {"remaining": remaining, "files": list_course_jobs(user, course)}}
     except Exception as e:
         return JSONResponse(status_code=500, content={"status": "error", "message": f"상태 조회 실패: {str(e)}"})
 
 
+@router.get("/cache_stats")
+def cache_stats():
+    try:
+        return {
+            "status": "success",
+            "data": {
+                "graph": get_graph_cache_stats(),
+                "embedding": embedding_model.stats(),
+                "rewrite": get_rewrite_stats(),
+                "answer": get_answer_cache_stats(),
+            }
+        }
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"status": "error", "message": f"캐시 상태 조회 실패: {str(e)}"})
+
+
 @router.post("/check_duplicate")
 def check_duplicate(data: dict = Body(...)):
     try:
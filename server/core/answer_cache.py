@@ -0,0 +1,129 @@
+# server/core/answer_cache.py
+
+import os
+import time
+import uuid
+from threading import Lock
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Hashable, List
+import numpy as np
+
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 60 * 60)))
+
+
+@dataclass
+class CachedAnswer:
+    vector: np.ndarray
+    answer: str
+    context_ids: List[str]
+    tokens: int
+    created_at: float
+
+
+class AnswerCache:
+    def __init__(self, threshold: float, max_entries: int, ttl: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._courses: dict[Hashable, OrderedDict[str, CachedAnswer]] = defaultdict(OrderedDict)
+        # 과목별로 캐시된 답변이 만들어진 인덱스 버전. 모든 프로세스가 CURRENT에서 같은 값을 읽으므로
+        # 다른 워커가 자료를 바꿔도 다음 조회에서 버전이 달라져 이전 답변을 버림
+        self._versions: dict[Hashable, str] = {}
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.invalidations = 0
+
+    def _check_version(self, key: Hashable, version: str):
+        # 호출하는 쪽에서 self._lock을 잡고 있어야 함
+        if self._versions.get(key) == version:
+            return
+        if self._courses.pop(key, None):
+            self.invalidations += 1
+        self._versions[key] = version
+
+    def lookup(self, key: Hashable, version: str, embedding: List[float]) -> CachedAnswer | None:
+        vector = _normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            self._check_version(key, version)
+            entries = self._courses.get(key)
+            if entries:
+                for entry_id in [i for i, e in entries.items() if now - e.created_at > self.ttl]:
+                    del entries[entry_id]
+
+            if not entries:
+                self.misses += 1
+                return None
+
+            entry_ids = list(entries.keys())
+            similarities = np.stack([entries[i].vector for i in entry_ids]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entries.move_to_end(entry_ids[best])
+            entry = entries[entry_ids[best]]
+            self.hits += 1
+            self.saved_tokens += entry.tokens
+            return entry
+
+    def put(self, key: Hashable, version: str, embedding: List[float], answer: str, context_ids: List[str], tokens: int):
+        with self._lock:
+            # 조회 이후 인덱스가 바뀌었다면 이전 문서로 만든 답변이므로 저장하지 않음
+            if self._versions.get(key) != version:
+                return
+
+            entries = self._courses[key]
+            entries[str(uuid.uuid4())] = CachedAnswer(
+                vector=_normalize(embedding),
+                answer=answer,
+                context_ids=context_ids,
+                tokens=tokens,
+                created_at=time.time(),
+            )
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._versions.pop(key, None)
+            if self._courses.pop(key, None):
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "courses": len(self._courses),
+                "entries": sum(len(entries) for entries in self._courses.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_tokens": self.saved_tokens,
+                "invalidations": self.invalidations,
+            }
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl=ANSWER_CACHE_TTL,
+)
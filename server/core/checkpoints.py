@@ -0,0 +1,166 @@
+# server/core/checkpoints.py
+
+import os
+import asyncio
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+
+CHECKPOINT_DB_PATH = Path(os.getenv("CHECKPOINT_DB_PATH", "data/checkpoints/checkpoints.db"))
+CHECKPOINT_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_BUSY_TIMEOUT_MS", "5000"))
+CHECKPOINT_MIGRATE_LEGACY = os.getenv("CHECKPOINT_MIGRATE_LEGACY", "true").lower() == "true"
+LEGACY_DB_PATH = Path("data/app.db")
+DELETE_BATCH_SIZE = 500
+
+_checkpointer: AsyncSqliteSaver | None = None
+_open_lock = asyncio.Lock()
+
+
+def _legacy_tables(conn: sqlite3.Connection) -> set[str]:
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('checkpoints', 'writes')"
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+async def _migrate_legacy(conn: aiosqlite.Connection):
+    if not LEGACY_DB_PATH.exists():
+        return
+    with sqlite3.connect(LEGACY_DB_PATH) as legacy:
+        tables = _legacy_tables(legacy)
+    if not tables:
+        return
+
+    # 예전에는 체크포인트를 app.db에 함께 저장했으므로 한 번만 옮기고 원본 테이블은 지움
+    await conn.execute("ATTACH DATABASE ? AS legacy", (str(LEGACY_DB_PATH),))
+    try:
+        for table in sorted(tables):
+            await conn.execute(f"INSERT OR IGNORE INTO main.{table} SELECT * FROM legacy.{table}")
+        await conn.commit()
+        for table in sorted(tables):
+            await conn.execute(f"DROP TABLE legacy.{table}")
+        await conn.commit()
+    finally:
+        await conn.execute("DETACH DATABASE legacy")
+    print(f"[checkpoints] app.db의 체크포인트를 {CHECKPOINT_DB_PATH}로 옮김")
+
+
+def _parse_thread_id(thread_id: str) -> tuple[str, str, str] | None:
+    user, sep, rest = thread_id.partition(":")
+    course, sep2, session_id = rest.rpartition(":")
+    if not (sep and sep2):
+        return None
+    return user, course, session_id
+
+
+async def _setup_registry(conn: aiosqlite.Connection):
+    async with conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoint_threads'"
+    ) as cursor:
+        exists = await cursor.fetchone() is not None
+
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS checkpoint_threads ("
+        "thread_id TEXT PRIMARY KEY, "
+        "user TEXT NOT NULL, "
+        "course TEXT NOT NULL, "
+        "session_id TEXT NOT NULL)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_checkpoint_threads_session "
+        "ON checkpoint_threads (user, course, session_id)"
+    )
+
+    if not exists:
+        # 레지스트리 도입 전에 만들어진 스레드는 "user:course:session_id" 형식의 id에서 한 번만 채움
+        async with conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+            thread_ids = [row[0] for row in await cursor.fetchall()]
+        rows = [(thread_id, *parsed) for thread_id in thread_ids if (parsed := _parse_thread_id(thread_id))]
+        await conn.executemany(
+            "INSERT OR IGNORE INTO checkpoint_threads (thread_id, user, course, session_id) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+    await conn.commit()
+
+
+async def open_checkpointer() -> AsyncSqliteSaver:
+    global _checkpointer
+    async with _open_lock:
+        if _checkpointer is not None:
+            return _checkpointer
+
+        os.makedirs(CHECKPOINT_DB_PATH.parent, exist_ok=True)
+        conn = await aiosqlite.connect(str(CHECKPOINT_DB_PATH))
+        await conn.execute(f"PRAGMA busy_timeout={CHECKPOINT_BUSY_TIMEOUT_MS}")
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+
+        checkpointer = AsyncSqliteSaver(conn)
+        await checkpointer.setup()
+        if CHECKPOINT_MIGRATE_LEGACY:
+            await _migrate_legacy(conn)
+        await _setup_registry(conn)
+
+        _checkpointer = checkpointer
+        return _checkpointer
+
+
+async def get_checkpointer() -> AsyncSqliteSaver:
+    if _checkpointer is not None:
+        return _checkpointer
+    return await open_checkpointer()
+
+
+async def close_checkpointer():
+    global _checkpointer
+    async with _open_lock:
+        checkpointer, _checkpointer = _checkpointer, None
+        if checkpointer is not None:
+            await checkpointer.conn.close()
+
+
+async def register_thread(user: str, course: str, session_id: str, thread_id: str):
+    # 다른 워커가 지웠을 수 있으므로 메모리에 기억해 두지 않고 매번 INSERT OR IGNORE로 기록함
+    checkpointer = await get_checkpointer()
+    # 체크포인터와 같은 연결을 쓰므로, 진행 중인 체크포인트 저장과 커밋이 섞이지 않게 같은 잠금을 잡음
+    async with checkpointer.lock:
+        await checkpointer.conn.execute(
+            "INSERT OR IGNORE INTO checkpoint_threads (thread_id, user, course, session_id) VALUES (?, ?, ?, ?)",
+            (thread_id, user, course, session_id),
+        )
+        await checkpointer.conn.commit()
+
+
+def connect_checkpoint_db() -> sqlite3.Connection:
+    os.makedirs(CHECKPOINT_DB_PATH.parent, exist_ok=True)
+    conn = sqlite3.connect(str(CHECKPOINT_DB_PATH), timeout=CHECKPOINT_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def delete_checkpoints(user: str, course: str, session_id: str | None = None):
+    query = "SELECT thread_id FROM checkpoint_threads WHERE user = ? AND course = ?"
+    params = [user, course]
+    if session_id is not None:
+        query += " AND session_id = ?"
+        params.append(session_id)
+
+    with closing(connect_checkpoint_db()) as conn:
+        try:
+            thread_ids = [row[0] for row in conn.execute(query, params).fetchall()]
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return
+            raise
+
+        # 배치마다 커밋해 쓰기 잠금을 짧게 잡고, 그 사이 진행 중인 대화의 체크포인트 저장이 끼어들 수 있게 함
+        for i in range(0, len(thread_ids), DELETE_BATCH_SIZE):
+            batch = thread_ids[i:i + DELETE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM writes WHERE thread_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM checkpoint_threads WHERE thread_id IN ({placeholders})", batch)
+            conn.commit()
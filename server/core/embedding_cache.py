@@ -0,0 +1,249 @@
+# server/core/embedding_cache.py
+
+import os
+import re
+import asyncio
+import time
+import sqlite3
+import hashlib
+import unicodedata
+from threading import Lock
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embeddings.db"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "4096"))
+
+_SQLITE_MAX_VARIABLES = 900
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, model_name: str, db_path: Path, max_bytes: int = 0, query_max_entries: int = 0):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.query_max_entries = query_max_entries
+
+        os.makedirs(db_path.parent, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._lock = Lock()
+
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 질문 임베딩용 프로세스 내 LRU. 디스크 계층은 문서 임베딩과 같은 테이블을 사용함
+        self._queries: OrderedDict[str, List[float]] = OrderedDict()
+        self.query_memory_hits = 0
+        self.query_disk_hits = 0
+        self.query_misses = 0
+
+    def _lookup(self, keys: List[str]) -> dict[str, List[float]]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+                batch = keys[i:i + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                self._conn.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE model = ? AND key IN ({placeholders})",
+                    [now, self.model_name, *batch],
+                )
+            self._conn.commit()
+        return found
+
+    def _store(self, items: dict[str, List[float]]):
+        now = time.time()
+        rows = [
+            (self.model_name, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            # 다른 요청이 먼저 넣어 INSERT OR IGNORE로 건너뛴 행은 크기에 더하지 않음
+            for row in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                if cursor.rowcount == 1:
+                    self._total_bytes += len(row[2])
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+
+        # 한 번에 예산의 90%까지 비워서 매 삽입마다 evict가 일어나지 않게 함
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT model, key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        victims = []
+        freed = 0
+        for model, key, nbytes in rows:
+            if self._total_bytes - freed <= target:
+                break
+            victims.append((model, key))
+            freed += nbytes
+        rows.close()
+
+        self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND key = ?", victims)
+        self._total_bytes -= freed
+        self.evictions += len(victims)
+
+    def _split_missing(self, keys: List[str], texts: List[str], cached: dict) -> dict[str, str]:
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_hash(text) for text in texts]
+        cached = self._lookup(list(set(keys)))
+        missing = self._split_missing(keys, texts, cached)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_hash(text) for text in texts]
+        cached = await asyncio.to_thread(self._lookup, list(set(keys)))
+        missing = self._split_missing(keys, texts, cached)
+
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._store, computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def _query_from_memory(self, key: str) -> List[float] | None:
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self.query_memory_hits += 1
+            return vector
+
+    def _remember_query(self, key: str, vector: List[float]):
+        with self._lock:
+            self._queries[key] = vector
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.query_max_entries:
+                self._queries.popitem(last=False)
+
+    def _query_from_disk(self, key: str) -> List[float] | None:
+        vector = self._lookup([key]).get(key)
+        with self._lock:
+            if vector is not None:
+                self.query_disk_hits += 1
+            else:
+                self.query_misses += 1
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        vector = self._query_from_memory(key)
+        if vector is not None:
+            return vector
+
+        vector = self._query_from_disk(key)
+        if vector is None:
+            vector = _as_float32(self.embeddings.embed_query(text))
+            self._store({key: vector})
+        self._remember_query(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        vector = self._query_from_memory(key)
+        if vector is not None:
+            return vector
+
+        vector = await asyncio.to_thread(self._query_from_disk, key)
+        if vector is None:
+            vector = _as_float32(await self.embeddings.aembed_query(text))
+            await asyncio.to_thread(self._store, {key: vector})
+        self._remember_query(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "query": {
+                "memory_entries": len(self._queries),
+                "memory_hits": self.query_memory_hits,
+                "disk_hits": self.query_disk_hits,
+                "misses": self.query_misses,
+            },
+        }
+
+
+def _as_float32(vector: List[float]) -> List[float]:
+    # 메모리 계층과 디스크 계층이 같은 값을 돌려주도록 저장 정밀도(float32)에 맞춤
+    return np.asarray(vector, dtype=np.float32).tolist()
+
+
+embedding_model = CachedEmbeddings(
+    OpenAIEmbeddings(model=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    db_path=EMBEDDING_CACHE_PATH,
+    max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+    query_max_entries=QUERY_CACHE_MAX_ENTRIES,
+)
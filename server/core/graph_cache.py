@@ -0,0 +1,87 @@
+# server/core/graph_cache.py
+
+from threading import Lock
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Hashable
+
+
+class GraphCache:
+    def __init__(self, max_entries: int = 32, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = Lock()
+        self._build_locks = defaultdict(Lock)
+        self._generations = defaultdict(int)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, build: Callable[[], Any], size: Callable[[], int]):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            build_lock = self._build_locks[key]
+
+        with build_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+                generation = self._generations[key]
+
+            value = build()
+            nbytes = size()
+
+            with self._lock:
+                # 빌드 도중 invalidate 되었다면 오래된 인덱스로 만든 그래프는 캐시하지 않음
+                if self._generations[key] == generation:
+                    self._put(key, value, nbytes)
+            return value
+
+    def _put(self, key: Hashable, value: Any, nbytes: int):
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, nbytes)
+        self._total_bytes += nbytes
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > 1 and self._over_budget():
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._total_bytes -= nbytes
+            self.evictions += 1
+
+    def _over_budget(self) -> bool:
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes and self._total_bytes > self.max_bytes:
+            return True
+        return False
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generations[key] += 1
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
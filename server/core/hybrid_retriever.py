@@ -0,0 +1,122 @@
+# server/core/hybrid_retriever.py
+
+import asyncio
+from typing import Any, List, Literal
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import (
+    CallbackManagerForRetrieverRun,
+    AsyncCallbackManagerForRetrieverRun,
+)
+from core.embedding_cache import embedding_model
+from core.snapshots import RetrievalSnapshot
+
+
+_sparse_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sparse-search")
+
+
+class HybridRetriever(BaseRetriever):
+    # 과목 인덱스의 현재 버전을 따라가는 CourseSnapshots
+    snapshots: Any
+    k: int = 5
+    fetch_k: int = 20
+    fusion: Literal["rrf", "weighted"] = "rrf"
+    sparse_weight: float = 0.4
+    dense_weight: float = 0.6
+    rrf_k: int = 60
+
+    def _snapshot(self) -> RetrievalSnapshot:
+        snapshot = self.snapshots.current()
+        if snapshot is None:
+            raise ValueError("해당 과목에는 강의자료가 없습니다.")
+        return snapshot
+
+    async def asnapshot(self) -> RetrievalSnapshot:
+        return await asyncio.get_running_loop().run_in_executor(None, self._snapshot)
+
+    def _sparse_search(self, snapshot: RetrievalSnapshot, query: str) -> tuple[np.ndarray, np.ndarray]:
+        return snapshot.sparse.search(query, self.fetch_k)
+
+    def _dense_search(self, snapshot: RetrievalSnapshot, embedding: List[float]) -> tuple[np.ndarray, np.ndarray]:
+        return snapshot.dense.search(embedding, self.fetch_k)
+
+    def _fuse(self, snapshot: RetrievalSnapshot, sparse_ids, sparse_scores, dense_ids, dense_scores) -> List[Document]:
+        candidates = np.union1d(sparse_ids, dense_ids)
+        if candidates.size == 0:
+            return []
+
+        sparse_pos = np.searchsorted(candidates, sparse_ids)
+        dense_pos = np.searchsorted(candidates, dense_ids)
+
+        per_sparse = np.full(candidates.size, np.nan, dtype=np.float32)
+        per_dense = np.full(candidates.size, np.nan, dtype=np.float32)
+        per_sparse[sparse_pos] = sparse_scores
+        per_dense[dense_pos] = dense_scores
+
+        fused = np.zeros(candidates.size, dtype=np.float32)
+        if self.fusion == "rrf":
+            fused[sparse_pos] += self.sparse_weight / (self.rrf_k + np.arange(1, sparse_ids.size + 1))
+            fused[dense_pos] += self.dense_weight / (self.rrf_k + np.arange(1, dense_ids.size + 1))
+        else:
+            fused[sparse_pos] += self.sparse_weight * _min_max(sparse_scores)
+            fused[dense_pos] += self.dense_weight * _min_max(dense_scores)
+
+        order = np.argsort(-fused, kind="stable")[: self.k]
+
+        docs = snapshot.dense.documents([int(candidates[i]) for i in order])
+        results = []
+        for i, doc in zip(order, docs):
+            metadata = dict(doc.metadata)
+            metadata["retrieval_scores"] = {
+                "sparse": _to_float(per_sparse[i]),
+                "dense": _to_float(per_dense[i]),
+                "fused": float(fused[i]),
+            }
+            results.append(Document(id=doc.id, page_content=doc.page_content, metadata=metadata))
+        return results
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # 질의 하나는 처음 잡은 스냅샷으로 끝까지 검색하므로 그 사이 새 버전이 공개되어도 결과가 섞이지 않음
+        snapshot = self._snapshot()
+        sparse_future = _sparse_executor.submit(self._sparse_search, snapshot, query)
+        dense_ids, dense_scores = self._dense_search(snapshot, embedding_model.embed_query(query))
+        sparse_ids, sparse_scores = sparse_future.result()
+        return self._fuse(snapshot, sparse_ids, sparse_scores, dense_ids, dense_scores)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.asearch_with_embedding(query, await embedding_model.aembed_query(query))
+
+    async def asearch_with_embedding(
+        self, query: str, embedding: List[float], snapshot: RetrievalSnapshot | None = None
+    ) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        snapshot = snapshot or await self.asnapshot()
+        sparse_task = loop.run_in_executor(_sparse_executor, self._sparse_search, snapshot, query)
+        dense_ids, dense_scores = await loop.run_in_executor(None, self._dense_search, snapshot, embedding)
+        sparse_ids, sparse_scores = await sparse_task
+        return self._fuse(snapshot, sparse_ids, sparse_scores, dense_ids, dense_scores)
+
+    def get_documents_by_ids(self, snapshot: RetrievalSnapshot, ids: List[str]) -> List[Document] | None:
+        positions = [snapshot.dense.position_of.get(doc_id) for doc_id in ids]
+        if any(position is None for position in positions):
+            return None
+        return snapshot.dense.documents(positions)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if high - low < 1e-12:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _to_float(value) -> float | None:
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,231 @@
+# server/core/ingestion.py
+
+import os
+import json
+import time
+import multiprocessing
+from threading import Lock
+from typing import List
+from pathlib import Path
+from importlib.metadata import version
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from core.parse_cache import file_sha256, options_fingerprint, load_parsed, save_parsed
+
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_NUM_THREADS = int(os.getenv("INGEST_NUM_THREADS", "0")) or max(1, (os.cpu_count() or 1) // INGEST_WORKERS)
+INGEST_EAGER_WARMUP = os.getenv("INGEST_EAGER_WARMUP", "false").lower() == "true"
+INGEST_OCR_LANG = [lang.strip() for lang in os.getenv("INGEST_OCR_LANG", "ko,en").split(",") if lang.strip()]
+INGEST_TEXT_MIN_CHARS = int(os.getenv("INGEST_TEXT_MIN_CHARS", "50"))
+
+PIPELINE_SETTINGS = {
+    "do_ocr": True,
+    "do_table_structure": True,
+    "ocr_lang": INGEST_OCR_LANG,
+    "text_min_chars": INGEST_TEXT_MIN_CHARS,
+    "image_text_chars": 200,
+    "image_area_ratio": 0.5,
+}
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+MARKDOWN_SEPARATORS = [
+    "\n\n```",
+    "\n```",
+    "\n\n<!-- image -->\n\n",
+    "\n\n### ",
+    "\n\n## ",
+    "\n\n# ",
+    "\n\n- ", "\n\n* ", "\n\n1. ",
+    "\n\n", "\n", " ", ""
+]
+
+# 워커 프로세스 안에서만 채워지는 변환기. API 프로세스는 docling을 import하지 않음
+_converter = None
+
+_executor = None
+_executor_lock = Lock()
+
+
+def parse_fingerprint() -> str:
+    return options_fingerprint(
+        version("docling"),
+        json.dumps(PIPELINE_SETTINGS, sort_keys=True),
+        json.dumps([CHUNK_SIZE, CHUNK_OVERLAP, MARKDOWN_SEPARATORS]),
+    )
+
+
+def _create_converter():
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import (
+        AcceleratorDevice,
+        AcceleratorOptions,
+        PdfPipelineOptions,
+    )
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    started = time.perf_counter()
+
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = PIPELINE_SETTINGS["do_ocr"]
+    pipeline_options.do_table_structure = PIPELINE_SETTINGS["do_table_structure"]
+    pipeline_options.ocr_options.lang = PIPELINE_SETTINGS["ocr_lang"]
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        num_threads=INGEST_NUM_THREADS, device=AcceleratorDevice.AUTO
+    )
+
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+    converter.initialize_pipeline(InputFormat.PDF)
+    print(f"[ingest worker {os.getpid()}] Docling 모델 로드 완료: {time.perf_counter() - started:.1f}s")
+    return converter
+
+
+def _get_converter():
+    global _converter
+    if _converter is None:
+        _converter = _create_converter()
+    return _converter
+
+
+def _init_worker():
+    os.environ["OMP_NUM_THREADS"] = str(INGEST_NUM_THREADS)
+    _get_converter()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def split_markdown(markdown_text: str, source: str) -> List[Document]:
+    markdown_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=MARKDOWN_SEPARATORS
+    )
+    doc = Document(
+        page_content=markdown_text,
+        metadata={"source": source}
+    )
+    return markdown_splitter.split_documents([doc])
+
+
+def needs_ocr(page: "fitz.Page", text: str) -> bool:
+    if len(text) < PIPELINE_SETTINGS["text_min_chars"]:
+        return True
+
+    # 글자가 조금 있어도 페이지 대부분이 이미지(스캔본, 캡처 슬라이드)라면 OCR로 보냄
+    if len(text) < PIPELINE_SETTINGS["image_text_chars"]:
+        page_area = abs(page.rect)
+        image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+        if page_area and image_area / page_area >= PIPELINE_SETTINGS["image_area_ratio"]:
+            return True
+
+    return False
+
+
+def _page_runs(flags: List[bool]) -> List[tuple[bool, int, int]]:
+    runs = []
+    for i, flag in enumerate(flags):
+        if runs and runs[-1][0] == flag:
+            runs[-1] = (flag, runs[-1][1], i)
+        else:
+            runs.append((flag, i, i))
+    return runs
+
+
+def _parse_in_worker(path: str, file_hash: str, fingerprint: str) -> tuple[List[Document], dict]:
+    pdf_path = Path(path)
+
+    with fitz.open(pdf_path) as pdf:
+        page_texts = [page.get_text("text").strip() for page in pdf]
+        ocr_flags = [needs_ocr(page, text) for page, text in zip(pdf, page_texts)]
+
+    sections = []
+    for ocr, start, end in _page_runs(ocr_flags):
+        if ocr:
+            # docling의 page_range는 1부터 시작하고 끝 페이지를 포함함
+            page_range = (start + 1, end + 1)
+            conv_result = _get_converter().convert(pdf_path, page_range=page_range)
+            sections.append(conv_result.document.export_to_markdown())
+        else:
+            sections.extend(text for text in page_texts[start:end + 1] if text)
+
+    markdown_text = "\n\n".join(sections)
+    chunks = split_markdown(markdown_text, pdf_path.name)
+    save_parsed(file_hash, fingerprint, markdown_text, chunks)
+
+    stats = {
+        "pages": len(ocr_flags),
+        "text_pages": ocr_flags.count(False),
+        "ocr_pages": ocr_flags.count(True),
+    }
+    return chunks, stats
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_up():
+    executor = get_executor()
+    for _ in range(INGEST_WORKERS):
+        executor.submit(_ping)
+
+
+def shutdown_ingestion():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_pdfs(paths: List[Path]):
+    fingerprint = parse_fingerprint()
+    results: List[List[Document] | None] = []
+    pending = {}
+
+    executor = get_executor()
+    for i, path in enumerate(paths):
+        file_hash = file_sha256(path)
+        chunks = load_parsed(file_hash, fingerprint, source=path.name)
+        results.append(chunks)
+        if chunks is None:
+            pending[i] = executor.submit(_parse_in_worker, str(path), file_hash, fingerprint)
+
+    try:
+        for i, future in pending.items():
+            results[i], stats = future.result()
+            print(
+                f"[ingest] {paths[i].name}: {stats['pages']}쪽 중 "
+                f"텍스트 추출 {stats['text_pages']}쪽, OCR {stats['ocr_pages']}쪽"
+            )
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+    return [chunk for chunks in results for chunk in chunks]
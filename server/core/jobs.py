@@ -0,0 +1,241 @@
+# server/core/jobs.py
+
+import os
+import traceback
+from pathlib import Path
+from threading import Thread, Event
+from datetime import datetime, timedelta
+from typing import List
+import fitz
+from sqlalchemy import update, exists
+from sqlalchemy.orm import aliased
+from database import SessionLocal
+from models.job import IngestJob
+from core.ingestion import parse_pdfs
+from core.embedding_cache import embedding_model
+from core.utils import replace_documents_by_source, remove_documents_by_source
+
+
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_JOB_HEARTBEAT = float(os.getenv("INGEST_JOB_HEARTBEAT", "30"))
+# 이 시간 동안 updated_at이 갱신되지 않은 실행 중 작업은 워커가 죽은 것으로 보고 다시 대기열에 넣음
+INGEST_JOB_STALE_AFTER = float(os.getenv("INGEST_JOB_STALE_AFTER", "300"))
+EMBED_BATCH_SIZE = 128
+
+ACTIVE_STATES = ("queued", "parsing", "embedding")
+
+_wakeup = Event()
+_stop = Event()
+_threads: List[Thread] = []
+
+
+def enqueue_files(user: str, course: str, paths: List[Path]):
+    with SessionLocal() as db:
+        for path in paths:
+            # 같은 파일의 이전 작업 기록은 정리하고, 이미 실행 중인 작업만 남겨둠
+            db.query(IngestJob).filter(
+                IngestJob.user == user,
+                IngestJob.course == course,
+                IngestJob.filename == path.name,
+                IngestJob.state.in_(("queued", "done", "failed")),
+            ).delete(synchronize_session=False)
+            db.add(IngestJob(user=user, course=course, filename=path.name, path=str(path), state="queued"))
+        db.commit()
+    _wakeup.set()
+
+
+def cancel_jobs(user: str, course: str, filename: str | None = None):
+    with SessionLocal() as db:
+        query = db.query(IngestJob).filter(IngestJob.user == user, IngestJob.course == course)
+        if filename is not None:
+            query = query.filter(IngestJob.filename == filename)
+        query.delete(synchronize_session=False)
+        db.commit()
+
+
+def count_active_jobs(user: str, course: str) -> int:
+    with SessionLocal() as db:
+        return db.query(IngestJob).filter(
+            IngestJob.user == user,
+            IngestJob.course == course,
+            IngestJob.state.in_(ACTIVE_STATES),
+        ).count()
+
+
+def list_course_jobs(user: str, course: str) -> List[dict]:
+    with SessionLocal() as db:
+        jobs = (
+            db.query(IngestJob)
+            .filter(IngestJob.user == user, IngestJob.course == course)
+            .order_by(IngestJob.id.asc())
+            .all()
+        )
+
+    latest = {}
+    for job in jobs:
+        latest[job.filename] = {
+            "filename": job.filename,
+            "state": job.state,
+            "pages_total": job.pages_total,
+            "pages_done": job.pages_done,
+            "chunks_total": job.chunks_total,
+            "chunks_done": job.chunks_done,
+            "attempts": job.attempts,
+            "error": job.error,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        }
+    return list(latest.values())
+
+
+def _update(job: dict, **values) -> bool:
+    # attempts는 작업을 가져갈 때마다 늘어나므로, 다른 워커가 다시 가져간 작업이면 갱신하지 않음
+    with SessionLocal() as db:
+        result = db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job["id"], IngestJob.attempts == job["attempts"])
+            .values(updated_at=datetime.now(), **values)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+
+def _exists(job_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.get(IngestJob, job_id) is not None
+
+
+def _claim_next() -> dict | None:
+    # 같은 파일의 이전 작업이 아직 실행 중이면 끝날 때까지 새 작업을 가져가지 않아, 늦게 끝난 이전 작업이 새 chunk를 덮어쓰지 않게 함
+    running = aliased(IngestJob)
+    same_file_running = exists().where(
+        running.user == IngestJob.user,
+        running.course == IngestJob.course,
+        running.filename == IngestJob.filename,
+        running.state.in_(("parsing", "embedding")),
+    )
+    with SessionLocal() as db:
+        now = datetime.now()
+        candidates = (
+            db.query(IngestJob.id)
+            .filter(IngestJob.state == "queued", IngestJob.available_at <= now, ~same_file_running)
+            .order_by(IngestJob.id.asc())
+            .limit(8)
+            .all()
+        )
+        for (job_id,) in candidates:
+            result = db.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job_id, IngestJob.state == "queued", ~same_file_running)
+                .values(state="parsing", attempts=IngestJob.attempts + 1, updated_at=now)
+            )
+            db.commit()
+            if result.rowcount == 1:
+                job = db.get(IngestJob, job_id)
+                return {
+                    "id": job.id,
+                    "user": job.user,
+                    "course": job.course,
+                    "filename": job.filename,
+                    "path": job.path,
+                    "attempts": job.attempts,
+                }
+    return None
+
+
+def _run_job(job: dict):
+    job_id, user, course, filename = job["id"], job["user"], job["course"], job["filename"]
+    path = Path(job["path"])
+
+    if not path.exists():
+        _update(job, state="failed", error="업로드된 파일을 찾을 수 없습니다.")
+        return
+
+    with fitz.open(path) as pdf:
+        pages_total = pdf.page_count
+    if not _update(job, pages_total=pages_total, pages_done=0, chunks_total=0, chunks_done=0):
+        return
+
+    chunks = parse_pdfs([path])
+    if not _update(job, state="embedding", pages_done=pages_total, chunks_total=len(chunks)):
+        return
+
+    # 배치 단위로 먼저 임베딩해 캐시를 채우면서 진행률을 기록하고, 저장 단계는 캐시만 사용함
+    for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+        batch = chunks[start:start + EMBED_BATCH_SIZE]
+        embedding_model.embed_documents([chunk.page_content for chunk in batch])
+        if not _update(job, chunks_done=start + len(batch)):
+            return
+
+    replace_documents_by_source(user, course, filename, chunks)
+
+    if (not _update(job, state="done", error=None) and not _exists(job_id)) or not path.exists():
+        # 처리 도중 파일/과목이 삭제된 경우 방금 넣은 chunk를 되돌림
+        remove_documents_by_source(user, course, filename)
+
+
+def _fail_or_retry(job: dict, error: Exception):
+    message = f"{type(error).__name__}: {error}"
+    print(f"[ingest job {job['id']}] {job['filename']} 처리 실패 ({job['attempts']}회차): {message}")
+    traceback.print_exc()
+
+    if job["attempts"] < INGEST_MAX_ATTEMPTS:
+        delay = timedelta(seconds=10 * 2 ** (job["attempts"] - 1))
+        _update(job, state="queued", error=message, available_at=datetime.now() + delay)
+    else:
+        _update(job, state="failed", error=message)
+
+
+def _heartbeat(job: dict, finished: Event):
+    # 파싱처럼 진행률 갱신 없이 오래 걸리는 단계에서도 살아 있는 작업이 다른 프로세스에 의해 복구되지 않게 함
+    while not finished.wait(INGEST_JOB_HEARTBEAT):
+        if not _update(job):
+            return
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        job = _claim_next()
+        if job is None:
+            recover_jobs()
+            _wakeup.wait(timeout=5)
+            _wakeup.clear()
+            continue
+
+        finished = Event()
+        Thread(target=_heartbeat, args=(job, finished), name=f"ingest-heartbeat-{job['id']}", daemon=True).start()
+        try:
+            _run_job(job)
+        except Exception as e:
+            _fail_or_retry(job, e)
+        finally:
+            finished.set()
+
+
+def recover_jobs():
+    # 다른 프로세스의 워커가 처리 중인 작업은 heartbeat로 updated_at이 계속 갱신되므로 건드리지 않음
+    stale_before = datetime.now() - timedelta(seconds=INGEST_JOB_STALE_AFTER)
+    with SessionLocal() as db:
+        db.execute(
+            update(IngestJob)
+            .where(IngestJob.state.in_(("parsing", "embedding")), IngestJob.updated_at < stale_before)
+            .values(state="queued", updated_at=datetime.now())
+        )
+        db.commit()
+
+
+def start_job_workers():
+    recover_jobs()
+    _stop.clear()
+    for i in range(INGEST_JOB_WORKERS):
+        thread = Thread(target=_worker_loop, name=f"ingest-job-{i}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_job_workers():
+    _stop.set()
+    _wakeup.set()
+    for thread in _threads:
+        thread.join(timeout=5)
+    _threads.clear()
@@ -0,0 +1,104 @@
+# server/core/memory.py
+
+import os
+from functools import lru_cache
+from typing import List, Sequence
+import tiktoken
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, RemoveMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "3000"))
+MEMORY_SUMMARIZE = os.getenv("MEMORY_SUMMARIZE", "false").lower() == "true"
+MEMORY_SUMMARY_MODEL = os.getenv("MEMORY_SUMMARY_MODEL", "gpt-4o-mini")
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "400"))
+
+# 메시지마다 role/구분자 등으로 붙는 대략적인 오버헤드
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You maintain a running summary of a study conversation between a student and an academic assistant. "
+     "Merge the existing summary with the new messages into one concise summary. "
+     "Keep course topics, definitions the student asked about, and any unresolved questions. "
+     "Write in the same language as the conversation and do not exceed {max_tokens} tokens."),
+    ("human", "Existing summary:\n{summary}\n\nNew messages:\n{messages}"),
+])
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_text_tokens(text: str) -> int:
+    return len(_encoding().encode(text))
+
+
+def count_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return count_text_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def split_by_budget(messages: Sequence[BaseMessage], max_tokens: int) -> tuple[List[BaseMessage], List[BaseMessage]]:
+    kept_tokens = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        kept_tokens += count_tokens(messages[i])
+        if kept_tokens > max_tokens:
+            break
+        start = i
+
+    # 질문-답변 쌍이 중간에서 잘리지 않도록 남기는 구간은 항상 사람 메시지로 시작
+    while start < len(messages) and not isinstance(messages[start], HumanMessage):
+        start += 1
+
+    # 마지막 턴 하나가 예산보다 길어도 직전 질문-답변 쌍은 항상 남김
+    last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+    if last_human is not None:
+        start = min(start, last_human)
+
+    return list(messages[:start]), list(messages[start:])
+
+
+def with_summary(chat_history: Sequence[BaseMessage], summary: str | None) -> List[BaseMessage]:
+    if not summary:
+        return list(chat_history)
+    return [SystemMessage(f"Summary of the earlier conversation:\n{summary}"), *chat_history]
+
+
+async def summarize(summary: str | None, messages: Sequence[BaseMessage]) -> str:
+    summarizer = ChatOpenAI(model=MEMORY_SUMMARY_MODEL, temperature=0, max_tokens=MEMORY_SUMMARY_MAX_TOKENS)
+    transcript = "\n".join(f"{message.type}: {message.content}" for message in messages)
+    result = await (summary_prompt | summarizer).ainvoke({
+        "summary": summary or "(none)",
+        "messages": transcript,
+        "max_tokens": MEMORY_SUMMARY_MAX_TOKENS,
+    })
+    return result.content.strip()
+
+
+def trim_history(chat_history: Sequence[BaseMessage], pending: Sequence[BaseMessage]) -> dict:
+    dropped, _ = split_by_budget(chat_history, MEMORY_MAX_TOKENS)
+    if not dropped:
+        return {}
+
+    update = {"chat_history": [RemoveMessage(id=message.id) for message in dropped]}
+    if MEMORY_SUMMARIZE:
+        # 요약 LLM 호출이 답변 응답을 늦추지 않도록, 빠진 메시지는 모아 두었다가 다음 턴에 검색과 함께 요약함
+        update["summary_pending"] = [*pending, *dropped]
+    return update
+
+
+async def fold_summary(summary: str | None, pending: Sequence[BaseMessage]) -> dict:
+    if not pending:
+        return {}
+    try:
+        return {"summary": await summarize(summary, pending), "summary_pending": []}
+    except Exception as e:
+        print("대화 요약 실패:", e)
+        return {"summary_pending": []}
@@ -0,0 +1,62 @@
+# server/core/parse_cache.py
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import List
+from langchain_core.documents import Document
+
+
+PARSE_CACHE_DIR = Path(os.getenv("PARSE_CACHE_DIR", "data/cache/parsed"))
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def options_fingerprint(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _entry_path(file_hash: str, fingerprint: str) -> Path:
+    return PARSE_CACHE_DIR / file_hash[:2] / f"{file_hash}-{fingerprint}.json"
+
+
+def load_parsed(file_hash: str, fingerprint: str, source: str) -> List[Document] | None:
+    entry_path = _entry_path(file_hash, fingerprint)
+    if not entry_path.exists():
+        return None
+
+    try:
+        with entry_path.open("r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return [
+        Document(page_content=chunk["page_content"], metadata={**chunk["metadata"], "source": source})
+        for chunk in entry["chunks"]
+    ]
+
+
+def save_parsed(file_hash: str, fingerprint: str, markdown: str, chunks: List[Document]):
+    entry_path = _entry_path(file_hash, fingerprint)
+    os.makedirs(entry_path.parent, exist_ok=True)
+
+    entry = {
+        "markdown": markdown,
+        "chunks": [
+            {"page_content": chunk.page_content, "metadata": chunk.metadata}
+            for chunk in chunks
+        ],
+    }
+
+    tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, entry_path)
@@ -0,0 +1,97 @@
+# server/core/query_rewrite.py
+
+import re
+import time
+from threading import Lock
+from collections import OrderedDict
+from typing import Sequence
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+
+# 이전 대화를 가리키는 지시어·대용 표현. 한국어는 뒤에 조사가 붙으므로 어절 시작에서만 찾고, 영어는 단어 단위로 찾음
+# 그리고·다시·자세히처럼 대부분의 질문에 나오는 접속어·부사는 넣지 않음
+KOREAN_FOLLOW_UP = re.compile(
+    r"(?:^|[\s,.!?'\"(])(?:"
+    r"[이그저]\s+\S"
+    r"|[이그저](?:것|거|게|건|걸)"
+    r"|[이그저]런(?!데)|[이그저]렇게"
+    r"|해당(?!하|되)"
+    r"|[위앞]\s+\S|[위앞]의|[위앞]에서\s*(?:말|설명|언급|나온)"
+    r"|방금|아까"
+    r")"
+)
+# that은 관계대명사로 흔히 쓰이므로 문장 처음이나 동사·전치사 바로 뒤에 올 때만 지시어로 봄
+ENGLISH_FOLLOW_UP = re.compile(
+    r"\b(it|its|this|these|those|they|them|their|above|previous|earlier|former|latter|"
+    r"same|also|again|more|else|why|elaborate|example|examples|what about|how about)\b"
+    r"|(?:^|\b(?:is|was|does|did|do|explain|about|of|in|on|for|with|from|use|mean|means)\s+)that\b",
+    re.IGNORECASE,
+)
+SHORT_QUESTION_CHARS = 12
+
+
+def needs_rewrite(question: str, chat_history: Sequence[BaseMessage]) -> bool:
+    if not chat_history:
+        return False
+
+    text = question.strip()
+    if len(text) <= SHORT_QUESTION_CHARS:
+        return True
+    return bool(KOREAN_FOLLOW_UP.search(text) or ENGLISH_FOLLOW_UP.search(text))
+
+
+class QueryRewriter:
+    def __init__(self, chain: Runnable, max_entries: int = 1024):
+        self.chain = chain
+        self.max_entries = max_entries
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = Lock()
+
+        self.rewrites = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self.rewrite_seconds = 0.0
+
+    def _cache_key(self, thread_id: str | None, question: str, chat_history: Sequence[BaseMessage]) -> tuple:
+        # 같은 세션의 같은 턴(마지막 메시지 id로 구분)에서 같은 질문이면 재작성 결과를 재사용
+        return (thread_id, chat_history[-1].id, question)
+
+    async def arewrite(self, question: str, chat_history: Sequence[BaseMessage], thread_id: str | None = None) -> str:
+        if not needs_rewrite(question, chat_history):
+            with self._lock:
+                self.skipped += 1
+            return question
+
+        key = self._cache_key(thread_id, question, chat_history)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+
+        started = time.perf_counter()
+        rewritten = (await self.chain.ainvoke({"input": question, "chat_history": chat_history})).strip() or question
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.rewrites += 1
+            self.rewrite_seconds += elapsed
+            self._cache[key] = rewritten
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return rewritten
+
+    def stats(self) -> dict:
+        with self._lock:
+            decisions = self.rewrites + self.skipped + self.cache_hits
+            avg_ms = self.rewrite_seconds / self.rewrites * 1000 if self.rewrites else 0.0
+            return {
+                "rewrites": self.rewrites,
+                "skipped": self.skipped,
+                "cache_hits": self.cache_hits,
+                "skip_rate": (self.skipped + self.cache_hits) / decisions if decisions else 0.0,
+                "avg_rewrite_ms": avg_ms,
+                # 건너뛴 호출마다 평균 재작성 지연만큼 절약했다고 추정
+                "estimated_saved_ms": (self.skipped + self.cache_hits) * avg_ms,
+            }
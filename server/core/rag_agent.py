@@ -1,33 +1,48 @@
 # server/core/rag_agent.py
 
-import sqlite3
+import os
+import asyncio
 from pathlib import Path
-from database import get_db_engine
-from typing import TypedDict, Annotated, Sequence
+from typing import TypedDict, Annotated, Sequence, List
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_community.retrievers import BM25Retriever
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain.chains import create_retrieval_chain
-from langchain.chains.history_aware_retriever import create_history_aware_retriever
+from langchain_openai import ChatOpenAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.retrievers import EnsembleRetriever
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.constants import START
-from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from core.embedding_cache import embedding_model
+from core.snapshots import CourseSnapshots
+from core.graph_cache import GraphCache
+from core.hybrid_retriever import HybridRetriever
+from core.memory import with_summary, trim_history, fold_summary, count_text_tokens
+from core.query_rewrite import QueryRewriter
+from core.answer_cache import ANSWER_CACHE_ENABLED, answer_cache
+from core.checkpoints import get_checkpointer, delete_checkpoints
 
 
 MATERIALS_DIR = Path("data/materials")
 VECTOR_DIR = Path("data/vectorstores")
-CHECKPOINT_DIR = Path("data/checkpoints")
 
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-large")
 llm = ChatOpenAI(model="gpt-4o", temperature=0.8)
 
-graph_checkpoints = {}
+REWRITE_MODEL = os.getenv("REWRITE_MODEL", "gpt-4o-mini")
+REWRITE_CACHE_MAX_ENTRIES = int(os.getenv("REWRITE_CACHE_MAX_ENTRIES", "1024"))
+rewrite_llm = ChatOpenAI(model=REWRITE_MODEL, temperature=0)
+
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "0.4"))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "0.6"))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", "32"))
+GRAPH_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CACHE_MAX_BYTES", str(4 * 1024 ** 3)))
+
+graph_cache = GraphCache(max_entries=GRAPH_CACHE_MAX_ENTRIES, max_bytes=GRAPH_CACHE_MAX_BYTES)
 
 
 system_prompt = (
@@ -57,91 +72,171 @@ contextualize_q_prompt = ChatPromptTemplate.from_messages([
     ("human", "{input}")
 ])
 
+query_rewriter = QueryRewriter(
+    contextualize_q_prompt | rewrite_llm | StrOutputParser(),
+    max_entries=REWRITE_CACHE_MAX_ENTRIES,
+)
 
-def load_retriever(user: str, course: str, k=5):
-    vector_path = VECTOR_DIR / user / course / "faiss_index"
-    docs_path = MATERIALS_DIR / user / course
-
-    documents = []
-    for file in docs_path.glob("*.pdf"):
-        loader = PyMuPDFLoader(str(file))
-        documents += loader.load()
 
-    if not documents:
+def load_retriever(user: str, course: str, k=5):
+    # 인덱스가 새 버전으로 바뀌면 다음 질의에서 스냅샷만 갈아끼우므로 그래프를 다시 만들 필요가 없음
+    snapshots = CourseSnapshots(user, course)
+    if snapshots.current() is None:
         raise ValueError("해당 과목에는 강의자료가 없습니다.")
 
-    bm25 = BM25Retriever.from_documents(documents)
-    bm25.k = k
-
-    faiss = FAISS.load_local(str(vector_path), embedding_model, allow_dangerous_deserialization=True)
-    dense = faiss.as_retriever(search_kwargs={"k": k})
-
-    return EnsembleRetriever(retrievers=[bm25, dense], weights=[0.4, 0.6])
+    return HybridRetriever(
+        snapshots=snapshots,
+        k=k,
+        fetch_k=max(HYBRID_FETCH_K, k),
+        fusion=HYBRID_FUSION,
+        sparse_weight=HYBRID_SPARSE_WEIGHT,
+        dense_weight=HYBRID_DENSE_WEIGHT,
+    )
 
 
 class State(TypedDict):
     input: str
     chat_history: Annotated[Sequence[BaseMessage], add_messages]
-    context: str
+    context: List[Document]
     answer: str
+    summary: str
+    # 대화 기록에서 빠졌지만 아직 summary에 합치지 않은 메시지
+    summary_pending: List[BaseMessage]
+    cache_hit: bool
+    # 캐시 미스 때 retrieve에서 만든 질문 임베딩과 검색한 인덱스 버전. generate가 답변과 함께 캐시에 넣을 때 씀
+    cache_version: str | None
+    query_embedding: List[float] | None
 
 
-def build_rag_graph(user: str, course: str):
-    retriever = create_history_aware_retriever(llm, load_retriever(user, course), contextualize_q_prompt)
+def build_rag_graph(user: str, course: str, checkpointer: AsyncSqliteSaver):
+    retriever = load_retriever(user, course)
     qa_chain = create_stuff_documents_chain(llm, qa_prompt)
-    rag_chain = create_retrieval_chain(retriever, qa_chain)
+    cache_key = (user, course)
+
+    async def search(state: State, config: RunnableConfig):
+        chat_history = state.get("chat_history", [])
+        query = await query_rewriter.arewrite(
+            state["input"],
+            with_summary(chat_history, state.get("summary")) if chat_history else [],
+            thread_id=config["configurable"].get("thread_id"),
+        )
+
+        if not ANSWER_CACHE_ENABLED:
+            return {"context": await retriever.ainvoke(query), "cache_hit": False, "query_embedding": None}
+
+        # 캐시 조회와 검색은 같은 스냅샷 기준으로 하고, 스냅샷 교체(인덱스 로드·BM25 병합)는 이벤트 루프 밖에서 함
+        snapshot, embedding = await asyncio.gather(retriever.asnapshot(), embedding_model.aembed_query(query))
+        cached = answer_cache.lookup(cache_key, snapshot.version, embedding)
+        context = retriever.get_documents_by_ids(snapshot, cached.context_ids) if cached else None
+        if context is not None:
+            return {
+                "context": context,
+                "chat_history": [
+                    HumanMessage(state["input"]),
+                    AIMessage(cached.answer),
+                ],
+                "answer": cached.answer,
+                "cache_hit": True,
+                "query_embedding": None,
+            }
+
+        return {
+            "context": await retriever.asearch_with_embedding(query, embedding, snapshot),
+            "cache_hit": False,
+            "cache_version": snapshot.version,
+            "query_embedding": embedding,
+        }
+
+    async def retrieve(state: State, config: RunnableConfig):
+        # 지난 턴에 빠진 메시지 요약은 검색과 동시에 진행해 답변 생성 전에 합침
+        folded, retrieved = await asyncio.gather(
+            fold_summary(state.get("summary"), state.get("summary_pending", [])),
+            search(state, config),
+        )
+        return {**retrieved, **folded}
+
+    async def generate(state: State):
+        chat_history = with_summary(state.get("chat_history", []), state.get("summary"))
+        answer = await qa_chain.ainvoke({
+            "input": state["input"],
+            "chat_history": chat_history,
+            "context": state["context"],
+        })
+
+        embedding = state.get("query_embedding")
+        if embedding is not None:
+            prompt_text = "".join(doc.page_content for doc in state["context"]) + state["input"]
+            answer_cache.put(
+                cache_key,
+                state["cache_version"],
+                embedding,
+                answer,
+                [doc.id for doc in state["context"]],
+                tokens=count_text_tokens(prompt_text) + count_text_tokens(answer),
+            )
 
-    def call_rag(state: State):
-        response = rag_chain.invoke(state)
         return {
             "chat_history": [
                 HumanMessage(state["input"]),
-                AIMessage(response["answer"]),
+                AIMessage(answer),
             ],
-            "context": response["context"],
-            "answer": response["answer"],
+            "answer": answer,
+            # 다음 턴 체크포인트까지 임베딩이 남지 않게 비움
+            "query_embedding": None,
         }
 
+    async def remember(state: State):
+        return trim_history(state.get("chat_history", []), state.get("summary_pending", []))
+
     builder = StateGraph(state_schema=State)
-    builder.add_edge(START, "RAG")
-    builder.add_node("RAG", call_rag)
+    builder.add_node("retrieve", retrieve)
+    builder.add_node("generate", generate)
+    builder.add_node("remember", remember)
+    builder.add_edge(START, "retrieve")
+    builder.add_conditional_edges(
+        "retrieve",
+        lambda state: "remember" if state.get("cache_hit") else "generate",
+        ["generate", "remember"],
+    )
+    builder.add_edge("generate", "remember")
+
+    return builder.compile(checkpointer=checkpointer)
+
+
+def estimate_course_bytes(user: str, course: str) -> int:
+    course_dir = VECTOR_DIR / user / course
+    if not course_dir.exists():
+        return 0
+    return sum(p.stat().st_size for p in course_dir.rglob("*") if p.is_file())
+
 
-    engine = get_db_engine()
-    conn = sqlite3.connect(engine.url.database, check_same_thread=False)
-    saver = SqliteSaver(conn)
+def get_or_create_graph(user: str, course: str, checkpointer: AsyncSqliteSaver):
+    return graph_cache.get_or_create(
+        (user, course),
+        build=lambda: build_rag_graph(user, course, checkpointer),
+        size=lambda: estimate_course_bytes(user, course),
+    )
 
-    return builder.compile(checkpointer=saver)
 
+async def aget_or_create_graph(user: str, course: str):
+    checkpointer = await get_checkpointer()
+    return await asyncio.to_thread(get_or_create_graph, user, course, checkpointer)
 
-def get_or_create_graph(user: str, course: str, session_id: str):
-    key = f"{user}:{course}:{session_id}"
-    if key not in graph_checkpoints:
-        graph = build_rag_graph(user, course)
-        graph_checkpoints[key] = graph
-    return graph_checkpoints[key]
+
+def get_graph_cache_stats() -> dict:
+    return graph_cache.stats()
+
+
+def get_rewrite_stats() -> dict:
+    return query_rewriter.stats()
+
+
+def get_answer_cache_stats() -> dict:
+    return answer_cache.stats()
 
 
 def delete_graphs_and_checkpoints_by_course(user: str, course: str):
-    prefix = f"{user}:{course}:"
-    to_delete = [key for key in graph_checkpoints if key.startswith(prefix)]
-    for key in to_delete:
-        del graph_checkpoints[key]
-    
-    engine = get_db_engine()
-    try:
-        with sqlite3.connect(engine.url.database, check_same_thread=False) as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM checkpoints WHERE thread_id LIKE ?", (f"{prefix}%",))
-            cursor.execute("DELETE FROM writes WHERE thread_id LIKE ?", (f"{prefix}%",))
-            conn.commit()
-    except sqlite3.OperationalError as e:
-        if "no such table" in str(e):
-            pass
-        else:
-            raise
-
-def refresh_graph(user: str, course: str):
-    prefix = f"{user}:{course}:"
-    for key in list(graph_checkpoints.keys()):
-        if key.startswith(prefix):
-            del graph_checkpoints[key]
\ No newline at end of file
+    graph_cache.invalidate((user, course))
+    answer_cache.invalidate((user, course))
+    delete_checkpoints(user, course)
+
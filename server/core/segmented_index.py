@@ -0,0 +1,568 @@
+# server/core/segmented_index.py
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+from contextlib import closing
+from threading import Event, Lock, Thread
+from pathlib import Path
+from typing import List
+import numpy as np
+import scipy.sparse as sp
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from core.state import with_faiss_lock
+from core.embedding_cache import embedding_model
+from core.vector_index import EMBEDDING_DIMENSIONS, SegmentVectors, read_dimensions, truncate, write_vectors
+from core.sparse_index import load_term_frequencies, save_term_frequencies, term_frequencies
+
+
+VECTOR_DIR = Path("data/vectorstores")
+INDEX_DIR_NAME = "index"
+CURRENT_NAME = "CURRENT"
+CHUNKS_NAME = "chunks.db"
+LEGACY_INDEX_NAME = "faiss_index"
+LEGACY_SPARSE_NAME = "bm25_index"
+LEGACY_MANIFEST_NAME = "manifest.json"
+
+COMPACT_MAX_SEGMENTS = int(os.getenv("COMPACT_MAX_SEGMENTS", "8"))
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("COMPACT_TOMBSTONE_RATIO", "0.2"))
+COMPACT_INTERVAL = float(os.getenv("COMPACT_INTERVAL", "60"))
+INDEX_KEEP_VERSIONS = max(1, int(os.getenv("INDEX_KEEP_VERSIONS", "2")))
+INDEX_GC_GRACE = float(os.getenv("INDEX_GC_GRACE", "600"))
+
+_LOAD_RETRIES = 3
+
+_pending_compactions: set[tuple[str, str]] = set()
+_pending_lock = Lock()
+_compact_event = Event()
+_stop_event = Event()
+_compactor: Thread | None = None
+
+
+def course_index_path(user: str, course: str) -> Path:
+    return VECTOR_DIR / user / course / INDEX_DIR_NAME
+
+
+def current_version(index_path: Path) -> str | None:
+    try:
+        return (index_path / CURRENT_NAME).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(index_path: Path, version: str | None = None) -> dict | None:
+    version = version or current_version(index_path)
+    if version is None:
+        return None
+    try:
+        with (index_path / "versions" / version / "manifest.json").open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    manifest["version"] = version
+    return manifest
+
+
+def _version_number(name: str) -> int | None:
+    number = name.split("-", 1)[0]
+    return int(number) if number.isdigit() else None
+
+
+def _list_versions(versions_dir: Path) -> List[Path]:
+    versions = [p for p in versions_dir.iterdir() if _version_number(p.name) is not None]
+    return sorted(versions, key=lambda p: _version_number(p.name))
+
+
+def publish_version(index_path: Path, manifest: dict) -> str:
+    # 버전 디렉터리는 한 번 쓰면 수정하지 않고, CURRENT 포인터만 os.replace로 원자적으로 바꿔 공개함
+    versions_dir = index_path / "versions"
+    os.makedirs(versions_dir, exist_ok=True)
+    versions = _list_versions(versions_dir)
+    latest = _version_number(versions[-1].name) if versions else 0
+    # 과목이 비워져 버전 디렉터리가 지워진 뒤 번호가 다시 1부터 시작해도, 캐시된 스냅샷이 같은 버전으로 착각하지 않게 고유 값을 붙임
+    version = f"{latest + 1:08d}-{uuid.uuid4().hex[:8]}"
+
+    tmp_dir = versions_dir / f".{version}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    with (tmp_dir / "manifest.json").open("w", encoding="utf-8") as f:
+        json.dump({"segments": manifest["segments"], "tombstones": manifest["tombstones"]}, f, ensure_ascii=False)
+    os.rename(tmp_dir, versions_dir / version)
+
+    tmp_pointer = index_path / f"{CURRENT_NAME}.{os.getpid()}.tmp"
+    tmp_pointer.write_text(version, encoding="utf-8")
+    os.replace(tmp_pointer, index_path / CURRENT_NAME)
+
+    _collect_garbage(index_path)
+    return version
+
+
+def _is_stale(path: Path, now: float) -> bool:
+    try:
+        return now - path.stat().st_mtime > INDEX_GC_GRACE
+    except FileNotFoundError:
+        return False
+
+
+def _collect_garbage(index_path: Path):
+    # 호출하는 쪽에서 with_faiss_lock을 잡고 있어야 함
+    # 최근 버전과 다음 버전으로 교체된 지 유예 시간이 안 지난 버전은 남겨, 그 버전을 읽고 있는 질의가 세그먼트를 잃지 않게 함
+    # 버전 디렉터리는 공개 후 수정하지 않으므로 다음 버전의 mtime이 곧 이 버전이 교체된 시각임
+    now = time.time()
+    versions_dir = index_path / "versions"
+    versions = _list_versions(versions_dir)
+    recent = set(versions[-INDEX_KEEP_VERSIONS:])
+    kept = [
+        path for path, successor in zip(versions, versions[1:] + [None])
+        if path in recent or successor is None or not _is_stale(successor, now)
+    ]
+
+    referenced = set()
+    for path in kept:
+        manifest = read_manifest(index_path, path.name)
+        if manifest is not None:
+            referenced.update(segment["name"] for segment in manifest["segments"])
+
+    for path in versions:
+        if path not in kept:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # 압축기가 잠금 밖에서 막 만든 세그먼트나 쓰는 중인 임시 디렉터리는 유예 시간이 지나기 전까지 건드리지 않음
+    segments_dir = index_path / "segments"
+    if segments_dir.exists():
+        for path in segments_dir.iterdir():
+            if path.name not in referenced and _is_stale(path, now):
+                shutil.rmtree(path, ignore_errors=True)
+    for path in versions_dir.glob(".*.tmp"):
+        if _is_stale(path, now):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _segment_path(index_path: Path, name: str) -> Path:
+    return index_path / "segments" / name
+
+
+def _connect_chunks(path: Path, read_only: bool = True) -> sqlite3.Connection:
+    if not read_only:
+        return sqlite3.connect(str(path))
+    # 세그먼트는 공개 후 바뀌지 않으므로 immutable로 열어 잠금·저널 확인 없이 읽음
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+
+
+def _write_chunks(path: Path, ids: List[str], docs: List[Document]):
+    with closing(_connect_chunks(path, read_only=False)) as conn:
+        conn.execute(
+            "CREATE TABLE chunks ("
+            "position INTEGER PRIMARY KEY, "
+            "id TEXT NOT NULL, "
+            "source TEXT, "
+            "page_content TEXT NOT NULL, "
+            "metadata TEXT NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO chunks (position, id, source, page_content, metadata) VALUES (?, ?, ?, ?, ?)",
+            (
+                (pos, doc_id, doc.metadata.get("source"), doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str))
+                for pos, (doc_id, doc) in enumerate(zip(ids, docs))
+            ),
+        )
+        conn.execute("CREATE INDEX ix_chunks_source ON chunks (source)")
+        conn.commit()
+
+
+def _write_segment(index_path: Path, ids: List[str], docs: List[Document], vectors: np.ndarray) -> dict:
+    # 세그먼트는 임시 이름으로 다 쓴 뒤 rename으로 공개하고, 이후에는 수정하지 않음
+    name = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+    tmp_path = _segment_path(index_path, f".{name}.tmp")
+    os.makedirs(tmp_path)
+    dims = write_vectors(tmp_path, vectors)
+    _write_chunks(tmp_path / CHUNKS_NAME, ids, docs)
+    save_term_frequencies(tmp_path, *term_frequencies(doc.page_content for doc in docs))
+    os.rename(tmp_path, _segment_path(index_path, name))
+    return {"name": name, "count": len(ids), "dims": dims}
+
+
+class Segment:
+    def __init__(self, path: Path):
+        self.path = path
+        # chunk 본문은 검색 결과에 필요한 것만 SQLite에서 읽음
+        self.vectors = SegmentVectors.open(path)
+        self._conn = _connect_chunks(path / CHUNKS_NAME)
+        self._lock = Lock()
+        self.ids = [row[0] for row in self._conn.execute("SELECT id FROM chunks ORDER BY position")]
+        self._terms = None
+
+    @property
+    def ntotal(self) -> int:
+        return self.vectors.ntotal
+
+    def documents(self, positions: List[int]) -> List[Document]:
+        placeholders = ",".join("?" * len(positions))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT position, id, page_content, metadata FROM chunks WHERE position IN ({placeholders})",
+                positions,
+            ).fetchall()
+        docs = {row[0]: Document(id=row[1], page_content=row[2], metadata=json.loads(row[3])) for row in rows}
+        return [docs[pos] for pos in positions]
+
+    def term_frequencies(self) -> tuple[sp.csr_matrix, List[str]]:
+        # 저장된 BM25 단어 빈도가 없거나 토크나이저 설정이 바뀐 세그먼트는 본문으로 한 번만 다시 계산해 둠
+        if self._terms is None:
+            terms = load_term_frequencies(self.path)
+            if terms is None:
+                terms = term_frequencies(doc.page_content for doc in self.all_documents())
+            self._terms = terms
+        return self._terms
+
+    def all_documents(self) -> List[Document]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, page_content, metadata FROM chunks ORDER BY position").fetchall()
+        return [Document(id=row[0], page_content=row[1], metadata=json.loads(row[2])) for row in rows]
+
+
+def _is_pickled(path: Path) -> bool:
+    return not (path / CHUNKS_NAME).exists()
+
+
+def _load_pickled(path: Path):
+    # 예전 LangChain FAISS 형식(index.pkl)은 변환할 때 한 번만 읽고, 질의 경로에서는 pickle을 쓰지 않음
+    store = FAISS.load_local(str(path), embedding_model, allow_dangerous_deserialization=True)
+    ids = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+    docs = [store.docstore.search(doc_id) for doc_id in ids]
+    return ids, docs, store.index
+
+
+def _convert_pickled_segment(path: Path):
+    ids, docs, _ = _load_pickled(path)
+    tmp_path = path / f".{CHUNKS_NAME}.{os.getpid()}.tmp"
+    tmp_path.unlink(missing_ok=True)
+    _write_chunks(tmp_path, ids, docs)
+    save_term_frequencies(path, *term_frequencies(doc.page_content for doc in docs))
+    os.replace(tmp_path, path / CHUNKS_NAME)
+    for legacy_name in ("index.pkl", "meta.json"):
+        (path / legacy_name).unlink(missing_ok=True)
+
+
+def _migrate_legacy(user: str, course: str):
+    course_dir = VECTOR_DIR / user / course
+    legacy_path = course_dir / LEGACY_INDEX_NAME
+    index_path = course_index_path(user, course)
+
+    if current_version(index_path) is None:
+        # 버전 디렉터리 도입 전의 단일 manifest.json은 첫 버전으로 그대로 공개함
+        legacy_manifest = index_path / LEGACY_MANIFEST_NAME
+        if legacy_manifest.exists():
+            with legacy_manifest.open("r", encoding="utf-8") as f:
+                publish_version(index_path, json.load(f))
+            legacy_manifest.unlink()
+        elif legacy_path.exists():
+            # 예전 단일 faiss_index는 그대로 첫 세그먼트로 옮기고, 따로 저장하던 BM25 chunk 파일은 지움
+            ids, docs, index = _load_pickled(legacy_path)
+            os.makedirs(index_path / "segments", exist_ok=True)
+            segment = _write_segment(index_path, ids, docs, index.reconstruct_n(0, index.ntotal))
+            publish_version(index_path, {"segments": [segment], "tombstones": []})
+            shutil.rmtree(legacy_path, ignore_errors=True)
+            shutil.rmtree(course_dir / LEGACY_SPARSE_NAME, ignore_errors=True)
+
+    manifest = read_manifest(index_path)
+    for segment in manifest["segments"] if manifest else []:
+        path = _segment_path(index_path, segment["name"])
+        if _is_pickled(path):
+            _convert_pickled_segment(path)
+
+
+def _needs_migration(user: str, course: str, manifest: dict | None) -> bool:
+    index_path = course_index_path(user, course)
+    if manifest is not None:
+        return any(_is_pickled(_segment_path(index_path, segment["name"])) for segment in manifest["segments"])
+    return (
+        (index_path / LEGACY_MANIFEST_NAME).exists()
+        or (VECTOR_DIR / user / course / LEGACY_INDEX_NAME).exists()
+    )
+
+
+class SegmentedIndex:
+    def __init__(self, version: str, names: List[str], segments: List[Segment], tombstones: set[str]):
+        self.version = version
+        self.names = names
+        self.segments = segments
+
+        self.ids = [doc_id for segment in segments for doc_id in segment.ids]
+        self.offsets = np.cumsum([0] + [segment.ntotal for segment in segments])
+        self.alive = np.array([doc_id not in tombstones for doc_id in self.ids], dtype=bool)
+        self.position_of = {doc_id: pos for pos, doc_id in enumerate(self.ids) if self.alive[pos]}
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.position_of)
+
+    def search(self, embedding: List[float], k: int) -> tuple[np.ndarray, np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+
+        positions, scores = [], []
+        for segment, offset in zip(self.segments, self.offsets):
+            n = segment.ntotal
+            dead = n - int(self.alive[offset:offset + n].sum())
+            if n == dead:
+                continue
+
+            # 삭제 표시된 chunk가 걸러져도 k개가 남도록 그만큼 더 가져옴
+            seg_positions, seg_scores = segment.vectors.search(vector, min(k + dead, n))
+            seg_positions = seg_positions + offset
+            keep = self.alive[seg_positions]
+            positions.append(seg_positions[keep])
+            scores.append(seg_scores[keep])
+
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        positions = np.concatenate(positions)
+        scores = np.concatenate(scores)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return positions[order], scores[order]
+
+    def documents(self, positions: List[int]) -> List[Document]:
+        # 상위 k개처럼 필요한 chunk만 세그먼트별로 한 번에 읽어옴
+        by_segment = {}
+        for position in positions:
+            segment = int(np.searchsorted(self.offsets, position, side="right")) - 1
+            by_segment.setdefault(segment, []).append(position)
+
+        docs = {}
+        for segment, seg_positions in by_segment.items():
+            offset = int(self.offsets[segment])
+            local = [position - offset for position in seg_positions]
+            docs.update(zip(seg_positions, self.segments[segment].documents(local)))
+        return [docs[position] for position in positions]
+
+    def document(self, position: int) -> Document:
+        return self.documents([position])[0]
+
+    def get_by_id(self, doc_id: str) -> Document | None:
+        position = self.position_of.get(doc_id)
+        return None if position is None else self.document(position)
+
+
+def load_course_index(user: str, course: str, previous: SegmentedIndex | None = None) -> SegmentedIndex | None:
+    index_path = course_index_path(user, course)
+    # 이전 스냅샷에 이미 올라와 있는 세그먼트는 이름으로 재사용하고 새로 생긴 세그먼트만 읽음
+    loaded = dict(zip(previous.names, previous.segments)) if previous is not None else {}
+    for _ in range(_LOAD_RETRIES):
+        manifest = read_manifest(index_path)
+        if _needs_migration(user, course, manifest):
+            with with_faiss_lock(user, course):
+                _migrate_legacy(user, course)
+            continue
+        if manifest is None:
+            return None
+
+        names = [segment["name"] for segment in manifest["segments"]]
+        try:
+            segments = [loaded.get(name) or Segment(_segment_path(index_path, name)) for name in names]
+        except (FileNotFoundError, RuntimeError, sqlite3.OperationalError):
+            # 읽는 사이 정리된 버전이라면 새 CURRENT로 다시 시도
+            continue
+        return SegmentedIndex(manifest["version"], names, segments, set(manifest["tombstones"]))
+
+    raise RuntimeError("강의자료 인덱스를 불러오지 못했습니다.")
+
+
+def _segment_dimensions(index_path: Path, segment: dict) -> int:
+    # 차원을 기록하기 전에 만든 세그먼트는 인덱스 헤더에서 읽음
+    if "dims" not in segment:
+        segment["dims"] = read_dimensions(_segment_path(index_path, segment["name"]))
+    return segment["dims"]
+
+
+def needs_compaction(index_path: Path, manifest: dict) -> bool:
+    if len(manifest["segments"]) > COMPACT_MAX_SEGMENTS:
+        return True
+    # EMBEDDING_DIMENSIONS가 바뀌어 차원이 다른 세그먼트가 섞이면 L2 거리를 서로 비교할 수 없으므로 한 차원으로 병합함
+    if len({_segment_dimensions(index_path, segment) for segment in manifest["segments"]}) > 1:
+        return True
+    total = sum(segment["count"] for segment in manifest["segments"])
+    return bool(total) and len(manifest["tombstones"]) / total >= COMPACT_TOMBSTONE_RATIO
+
+
+def _build_segment(index_path: Path, chunks: List[Document]) -> dict:
+    os.makedirs(index_path / "segments", exist_ok=True)
+    ids = [chunk.id for chunk in chunks]
+    vectors = embedding_model.embed_documents([chunk.page_content for chunk in chunks])
+    return _write_segment(index_path, ids, chunks, np.asarray(vectors, dtype=np.float32))
+
+
+def _drop_source(index_path: Path, manifest: dict, filename: str) -> tuple[List[dict], set[str], bool]:
+    tombstones = set(manifest["tombstones"])
+    kept = []
+    removed = False
+    for segment in manifest["segments"]:
+        with closing(_connect_chunks(_segment_path(index_path, segment["name"]) / CHUNKS_NAME)) as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM chunks WHERE source = ?", (filename,))]
+            ids = [doc_id for doc_id in ids if doc_id not in tombstones]
+            if not ids:
+                kept.append(segment)
+                continue
+            removed = True
+            tombstones.update(ids)
+            segment_ids = [row[0] for row in conn.execute("SELECT id FROM chunks")]
+
+        if all(doc_id in tombstones for doc_id in segment_ids):
+            tombstones.difference_update(segment_ids)
+        else:
+            kept.append(segment)
+    return kept, tombstones, removed
+
+
+def remove_source(user: str, course: str, filename: str) -> bool:
+    # 호출하는 쪽에서 with_faiss_lock을 잡고 있어야 함
+    _migrate_legacy(user, course)
+    index_path = course_index_path(user, course)
+    manifest = read_manifest(index_path)
+    if manifest is None:
+        return False
+
+    kept, tombstones, removed = _drop_source(index_path, manifest, filename)
+    if not removed:
+        return False
+
+    if not kept:
+        shutil.rmtree(index_path)
+        course_dir = index_path.parent
+        if course_dir.exists() and not any(course_dir.iterdir()):
+            course_dir.rmdir()
+        return True
+
+    # 빠진 세그먼트 디렉터리는 이전 버전을 읽는 질의가 끝날 수 있도록 가비지 컬렉션에서 유예 후 지움
+    manifest = {"segments": kept, "tombstones": sorted(tombstones)}
+    publish_version(index_path, manifest)
+
+    if needs_compaction(index_path, manifest):
+        request_compaction(user, course)
+    return True
+
+
+def replace_source(user: str, course: str, filename: str, chunks: List[Document]):
+    if not chunks:
+        with with_faiss_lock(user, course):
+            remove_source(user, course, filename)
+        return
+
+    # 새 세그먼트를 먼저 다 만든 뒤, 새 세그먼트 추가와 이전 chunk 삭제를 한 버전으로 공개함
+    # 그래서 질의가 파일이 빠진 중간 버전을 보지 않고, 임베딩·저장이 실패하면 이전 chunk가 그대로 남음
+    index_path = course_index_path(user, course)
+    segment = _build_segment(index_path, chunks)
+
+    with with_faiss_lock(user, course):
+        _migrate_legacy(user, course)
+        manifest = read_manifest(index_path) or {"segments": [], "tombstones": []}
+        kept, tombstones, _ = _drop_source(index_path, manifest, filename)
+        manifest = {
+            "segments": kept + [segment],
+            "tombstones": sorted(tombstones),
+        }
+        publish_version(index_path, manifest)
+
+    if needs_compaction(index_path, manifest):
+        request_compaction(user, course)
+
+
+def compact_course(user: str, course: str):
+    index_path = course_index_path(user, course)
+    with with_faiss_lock(user, course):
+        _migrate_legacy(user, course)
+        manifest = read_manifest(index_path)
+    if manifest is None or not needs_compaction(index_path, manifest):
+        return
+
+    names = [segment["name"] for segment in manifest["segments"]]
+    tombstones = set(manifest["tombstones"])
+
+    # 무거운 병합은 잠금 밖에서 스냅샷 기준으로 수행하므로 그동안 업로드와 질문은 막히지 않음
+    segments = [Segment(_segment_path(index_path, name)) for name in names]
+    # EMBEDDING_DIMENSIONS가 바뀌기 전후의 세그먼트가 섞여 있으면 설정값과 가장 작은 차원 중 작은 쪽에 맞춰 합침
+    dimensions = min(segment.vectors.dimensions for segment in segments)
+    if EMBEDDING_DIMENSIONS:
+        dimensions = min(dimensions, EMBEDDING_DIMENSIONS)
+    docs, vectors, ids = [], [], []
+    for segment in segments:
+        alive = np.array([doc_id not in tombstones for doc_id in segment.ids], dtype=bool)
+        vectors.append(truncate(segment.vectors.reconstruct_all()[alive], dimensions))
+        docs.extend(doc for doc, keep in zip(segment.all_documents(), alive) if keep)
+        ids.extend(doc_id for doc_id, keep in zip(segment.ids, alive) if keep)
+
+    if not ids:
+        return
+
+    base = _write_segment(index_path, ids, docs, np.concatenate(vectors))
+
+    with with_faiss_lock(user, course):
+        current = read_manifest(index_path)
+        current_names = {segment["name"] for segment in current["segments"]} if current else set()
+        if not set(names) <= current_names:
+            # 병합하는 동안 세그먼트가 통째로 삭제되었다면 이번 결과는 버리고 다음 기회에 다시 병합
+            shutil.rmtree(_segment_path(index_path, base["name"]), ignore_errors=True)
+            return
+
+        publish_version(index_path, {
+            "segments": [base]
+            + [segment for segment in current["segments"] if segment["name"] not in names],
+            "tombstones": [doc_id for doc_id in current["tombstones"] if doc_id not in tombstones],
+        })
+
+    print(f"[compactor] {user}/{course}: 세그먼트 {len(names)}개를 chunk {len(ids)}개로 병합")
+
+
+def request_compaction(user: str, course: str):
+    with _pending_lock:
+        _pending_compactions.add((user, course))
+    _compact_event.set()
+
+
+def _scan_courses():
+    if not VECTOR_DIR.exists():
+        return
+    for pointer_path in VECTOR_DIR.glob(f"*/*/{INDEX_DIR_NAME}/{CURRENT_NAME}"):
+        user, course = pointer_path.parts[-4], pointer_path.parts[-3]
+        manifest = read_manifest(pointer_path.parent)
+        if manifest and needs_compaction(pointer_path.parent, manifest):
+            request_compaction(user, course)
+
+
+def _compactor_loop():
+    _scan_courses()
+    while not _stop_event.is_set():
+        _compact_event.wait(COMPACT_INTERVAL)
+        _compact_event.clear()
+        with _pending_lock:
+            pending = list(_pending_compactions)
+            _pending_compactions.clear()
+
+        for user, course in pending:
+            if _stop_event.is_set():
+                return
+            try:
+                compact_course(user, course)
+            except Exception as e:
+                print(f"[compactor] {user}/{course} 병합 실패: {e}")
+
+
+def start_compactor():
+    global _compactor
+    if _compactor is not None:
+        return
+    _stop_event.clear()
+    _compactor = Thread(target=_compactor_loop, name="index-compactor", daemon=True)
+    _compactor.start()
+
+
+def stop_compactor():
+    global _compactor
+    _stop_event.set()
+    _compact_event.set()
+    if _compactor is not None:
+        _compactor.join(timeout=5)
+        _compactor = None
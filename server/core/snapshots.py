@@ -0,0 +1,53 @@
+# server/core/snapshots.py
+
+from threading import Lock
+from dataclasses import dataclass
+from core.sparse_index import BM25Index
+from core.segmented_index import SegmentedIndex, course_index_path, current_version, load_course_index
+
+
+@dataclass
+class RetrievalSnapshot:
+    version: str
+    dense: SegmentedIndex
+    # 행 번호가 dense 인덱스의 chunk 위치와 같은 BM25 인덱스
+    sparse: BM25Index
+
+
+def build_snapshot(dense: SegmentedIndex) -> RetrievalSnapshot:
+    # 세그먼트별로 저장된 단어 빈도를 합치기만 하므로 chunk 본문을 다시 읽거나 토큰화하지 않음
+    sparse = BM25Index([segment.term_frequencies() for segment in dense.segments], dense.alive)
+    return RetrievalSnapshot(version=dense.version, dense=dense, sparse=sparse)
+
+
+class CourseSnapshots:
+    def __init__(self, user: str, course: str):
+        self.user = user
+        self.course = course
+        self.index_path = course_index_path(user, course)
+
+        self._snapshot: RetrievalSnapshot | None = None
+        self._lock = Lock()
+        self.reloads = 0
+
+    def current(self) -> RetrievalSnapshot | None:
+        # CURRENT 포인터만 읽어 버전이 같으면 그대로 쓰고, 바뀌었을 때만 새 세그먼트를 읽어 스냅샷을 교체함
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == current_version(self.index_path):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == current_version(self.index_path):
+                return snapshot
+
+            dense = load_course_index(self.user, self.course, previous=snapshot.dense if snapshot else None)
+            if dense is None or dense.ntotal == 0:
+                self._snapshot = None
+                return None
+
+            if snapshot is not None:
+                self.reloads += 1
+            # 교체 전 스냅샷을 잡고 있는 질의는 그 스냅샷으로 끝까지 검색함
+            self._snapshot = build_snapshot(dense)
+            return self._snapshot
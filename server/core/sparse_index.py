@@ -0,0 +1,188 @@
+# server/core/sparse_index.py
+
+import os
+import re
+import json
+from pathlib import Path
+from collections import Counter
+from typing import Callable, Iterable, List
+import numpy as np
+import scipy.sparse as sp
+
+
+BM25_TOKENIZER = os.getenv("BM25_TOKENIZER", "mixed")
+BM25_NGRAM = int(os.getenv("BM25_NGRAM", "2"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+TERMS_NAME = "bm25.npz"
+VOCAB_NAME = "bm25_vocab.json"
+# 토크나이저 규칙이 바뀌면 올려서 예전 세그먼트의 단어 빈도를 다시 계산하게 함
+_TOKENIZER_VERSION = 1
+
+_WORD = re.compile(r"[가-힣]+|[a-z]+|[0-9]+")
+
+
+def hangul_ngrams(word: str, n: int = BM25_NGRAM) -> List[str]:
+    # 한국어는 조사·어미가 붙어 어절 단위로는 잘 맞지 않으므로 글자 n-gram으로 나눔
+    if len(word) <= n:
+        return [word]
+    return [word[i:i + n] for i in range(len(word) - n + 1)]
+
+
+def stem_english(word: str) -> str:
+    # 복수형·진행형·과거형 정도만 떼는 가벼운 어간 추출. 과하게 합쳐 다른 단어가 섞이지 않도록 규칙을 적게 둠
+    if len(word) <= 3:
+        return word
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("es") and word[:-2].endswith(("x", "z", "ch", "sh")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def mixed_tokens(text: str) -> List[str]:
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if "가" <= word[0] <= "힣":
+            tokens.extend(hangul_ngrams(word))
+        elif word[0].isdigit():
+            tokens.append(word)
+        else:
+            tokens.append(stem_english(word))
+    return tokens
+
+
+def hangul_tokens(text: str) -> List[str]:
+    return [gram for word in _WORD.findall(text.lower()) for gram in hangul_ngrams(word)]
+
+
+def english_tokens(text: str) -> List[str]:
+    return [stem_english(word) for word in _WORD.findall(text.lower())]
+
+
+def whitespace_tokens(text: str) -> List[str]:
+    return text.lower().split()
+
+
+TOKENIZERS: dict[str, Callable[[str], List[str]]] = {
+    "mixed": mixed_tokens,
+    "hangul_ngram": hangul_tokens,
+    "english_stem": english_tokens,
+    "whitespace": whitespace_tokens,
+}
+
+
+def get_tokenizer(name: str = BM25_TOKENIZER) -> Callable[[str], List[str]]:
+    if name not in TOKENIZERS:
+        raise ValueError(f"지원하지 않는 BM25_TOKENIZER입니다: {name}")
+    return TOKENIZERS[name]
+
+
+def tokenizer_fingerprint(name: str = BM25_TOKENIZER) -> str:
+    return f"{name}:{BM25_NGRAM}:{_TOKENIZER_VERSION}"
+
+
+def term_frequencies(texts: Iterable[str], tokenize: Callable[[str], List[str]] | None = None) -> tuple[sp.csr_matrix, List[str]]:
+    tokenize = tokenize or get_tokenizer()
+    vocab: dict[str, int] = {}
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        for term, count in Counter(tokenize(text)).items():
+            indices.append(vocab.setdefault(term, len(vocab)))
+            data.append(count)
+        indptr.append(len(indices))
+
+    matrix = sp.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(vocab)),
+    )
+    return matrix, list(vocab)
+
+
+def save_term_frequencies(path: Path, matrix: sp.csr_matrix, terms: List[str]):
+    sp.save_npz(path / TERMS_NAME, matrix)
+    with (path / VOCAB_NAME).open("w", encoding="utf-8") as f:
+        json.dump({"tokenizer": tokenizer_fingerprint(), "terms": terms}, f, ensure_ascii=False)
+
+
+def load_term_frequencies(path: Path) -> tuple[sp.csr_matrix, List[str]] | None:
+    try:
+        with (path / VOCAB_NAME).open("r", encoding="utf-8") as f:
+            vocab = json.load(f)
+    except FileNotFoundError:
+        return None
+    if vocab["tokenizer"] != tokenizer_fingerprint():
+        return None
+    return sp.load_npz(path / TERMS_NAME).tocsr(), vocab["terms"]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        parts: List[tuple[sp.csr_matrix, List[str]]],
+        alive: np.ndarray,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        tokenize: Callable[[str], List[str]] | None = None,
+    ):
+        self.tokenize = tokenize or get_tokenizer()
+
+        # 세그먼트마다 따로 저장된 단어 사전을 하나로 합치고, 행 순서는 dense 인덱스의 chunk 위치와 같게 유지함
+        self.vocab: dict[str, int] = {}
+        mappings = []
+        for _, terms in parts:
+            mappings.append(np.fromiter(
+                (self.vocab.setdefault(term, len(self.vocab)) for term in terms),
+                dtype=np.int32,
+                count=len(terms),
+            ))
+        blocks = [
+            sp.csr_matrix((tf.data, mapping[tf.indices], tf.indptr), shape=(tf.shape[0], len(self.vocab)))
+            for (tf, _), mapping in zip(parts, mappings)
+        ]
+        tf = sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix((0, 0), dtype=np.float32)
+
+        # 삭제 표시된 chunk는 행을 비워 문서 수·평균 길이·df 계산과 검색 결과에서 모두 빠지게 함
+        tf = (sp.diags(alive.astype(np.float32)) @ tf).tocsr()
+        tf.eliminate_zeros()
+
+        n = max(int(alive.sum()), 1)
+        lengths = np.asarray(tf.sum(axis=1)).ravel()
+        avg_length = lengths.sum() / n or 1.0
+        df = np.bincount(tf.indices, minlength=tf.shape[1])
+        idf = np.log((n - df + 0.5) / (df + 0.5) + 1.0).astype(np.float32)
+
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * lengths[rows] / avg_length)
+        tf.data = (idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)).astype(np.float32)
+
+        # 질의 단어의 행만 골라 더하면 되도록 단어×문서 CSR로 보관함
+        self.matrix = tf.T.tocsr()
+        self.size = tf.shape[0]
+
+    def search(self, query: str, k: int) -> tuple[np.ndarray, np.ndarray]:
+        ids = [self.vocab[term] for term in self.tokenize(query) if term in self.vocab]
+        if not ids or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        term_ids, counts = np.unique(np.asarray(ids, dtype=np.int64), return_counts=True)
+        scores = np.asarray(self.matrix[term_ids].T @ counts.astype(np.float32)).ravel()
+
+        top = np.argpartition(-scores, k - 1)[:k] if scores.size > k else np.arange(scores.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] > 0]
+        return top.astype(np.int64), scores[top]
@@ -1,30 +1,36 @@
 # server/core/state.py
 
+import os
+from pathlib import Path
 from threading import Lock
+from contextlib import contextmanager
 from collections import defaultdict
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-_processing_status = defaultdict(int)
-_status_lock = Lock()
-_faiss_locks = defaultdict(Lock)
-
-
-def mark_processing(user: str, course: str):
-    with _status_lock:
-        _processing_status[(user, course)] += 1
 
+# 과목 인덱스를 지우거나 다시 만들어도 잠금 파일은 남아 있도록 인덱스 디렉터리 밖에 둠
+LOCK_DIR = Path("data/locks")
 
-def mark_done(user: str, course: str):
-    with _status_lock:
-        key = (user, course)
-        if key in _processing_status:
-            _processing_status[key] = max(_processing_status[key] - 1, 0)
-
+_faiss_locks = defaultdict(Lock)
 
-def get_status(user: str, course: str) -> int:
-    with _status_lock:
-        return _processing_status.get((user, course), 0)
-    
 
+@contextmanager
 def with_faiss_lock(user: str, course: str):
-    return _faiss_locks[(user, course)]
+    # 같은 프로세스의 스레드끼리는 Lock으로, 여러 워커 프로세스끼리는 과목별 잠금 파일의 flock으로 막음
+    with _faiss_locks[(user, course)]:
+        if fcntl is None:
+            yield
+            return
+
+        path = LOCK_DIR / user / f"{course}.lock"
+        os.makedirs(path.parent, exist_ok=True)
+        with path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
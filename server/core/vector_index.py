@@ -0,0 +1,152 @@
+# server/core/vector_index.py
+
+import os
+import math
+from pathlib import Path
+import faiss
+import numpy as np
+
+
+# text-embedding-3 임베딩은 앞부분만 잘라 다시 정규화해도 되도록 학습되어 있어, API 호출 없이 차원을 줄일 수 있음
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+INDEX_VECTOR_DTYPE = os.getenv("INDEX_VECTOR_DTYPE", "float32")
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+INDEX_IVF_MIN_VECTORS = int(os.getenv("INDEX_IVF_MIN_VECTORS", "10000"))
+INDEX_IVF_NPROBE = int(os.getenv("INDEX_IVF_NPROBE", "16"))
+INDEX_PQ_M = int(os.getenv("INDEX_PQ_M", "0"))
+INDEX_RESCORE_FACTOR = int(os.getenv("INDEX_RESCORE_FACTOR", "4"))
+
+VECTORS_NAME = "index.faiss"
+EXACT_VECTORS_NAME = "vectors.npy"
+
+_SQ_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+# IVF 학습에 중심점 하나당 필요한 최소 벡터 수 (faiss 권장값)
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def truncate(vectors: np.ndarray, dimensions: int = 0) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    if dimensions and dimensions < vectors.shape[1]:
+        vectors = vectors[:, :dimensions]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.ascontiguousarray(vectors / np.where(norms > 0, norms, 1))
+
+
+def _pq_m(d: int) -> int:
+    if INDEX_PQ_M:
+        return INDEX_PQ_M
+    # 벡터당 약 d/16 바이트가 되도록, d를 나누어떨어지게 하는 가장 큰 sub-quantizer 수를 고름
+    return max(m for m in range(1, max(1, d // 16) + 1) if d % m == 0)
+
+
+def factory_string(
+    n: int,
+    d: int,
+    index_type: str = INDEX_TYPE,
+    dtype: str = INDEX_VECTOR_DTYPE,
+    min_vectors: int = INDEX_IVF_MIN_VECTORS,
+) -> str:
+    codes = _SQ_CODES.get(dtype)
+    if codes is None:
+        raise ValueError(f"지원하지 않는 INDEX_VECTOR_DTYPE입니다: {dtype}")
+    if index_type not in ("flat", "ivf", "ivfpq"):
+        raise ValueError(f"지원하지 않는 INDEX_TYPE입니다: {index_type}")
+
+    # 작은 델타 세그먼트는 학습할 벡터가 부족하므로 IVF 계열을 설정해도 flat으로 만듦
+    if index_type == "flat" or n < min_vectors:
+        return codes
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // _MIN_POINTS_PER_CENTROID))
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{_pq_m(d)}"
+    return f"IVF{nlist},{codes}"
+
+
+def is_exact(index: faiss.Index) -> bool:
+    return isinstance(index, faiss.IndexFlat)
+
+
+def build_index(vectors: np.ndarray, factory: str | None = None) -> faiss.Index:
+    n, d = vectors.shape
+    index = faiss.index_factory(d, factory or factory_string(n, d), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def write_vectors(path: Path, vectors: np.ndarray, dimensions: int = EMBEDDING_DIMENSIONS) -> int:
+    vectors = truncate(vectors, dimensions)
+    index = build_index(vectors)
+    faiss.write_index(index, str(path / VECTORS_NAME))
+    if not is_exact(index):
+        # 압축된 인덱스에서 뽑은 후보를 원래 벡터로 다시 채점하고, 병합 때도 손실 없이 옮기기 위해 보관함
+        np.save(path / EXACT_VECTORS_NAME, vectors)
+    return index.d
+
+
+def read_dimensions(path: Path) -> int:
+    return faiss.read_index(str(path / VECTORS_NAME), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY).d
+
+
+def set_nprobe(index: faiss.Index, nprobe: int = INDEX_IVF_NPROBE):
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+
+
+class SegmentVectors:
+    def __init__(self, index: faiss.Index, exact: np.ndarray | None = None):
+        self.index = index
+        self.exact = exact
+        set_nprobe(self.index)
+
+    @classmethod
+    def open(cls, path: Path) -> "SegmentVectors":
+        # 벡터는 mmap으로 열어 여러 워커가 같은 페이지 캐시를 공유함
+        index = faiss.read_index(str(path / VECTORS_NAME), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        exact_path = path / EXACT_VECTORS_NAME
+        return cls(index, np.load(exact_path, mmap_mode="r") if exact_path.exists() else None)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def dimensions(self) -> int:
+        return self.index.d
+
+    def reconstruct_all(self) -> np.ndarray:
+        if self.exact is not None:
+            return np.asarray(self.exact)
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        # 세그먼트마다 저장된 차원에 맞춰 질문 벡터를 자르고, L2 거리는 부호를 뒤집어 "클수록 좋은" 점수로 돌려줌
+        vector = truncate(query, self.dimensions)
+        fetch = k if self.exact is None else min(self.ntotal, k * max(1, INDEX_RESCORE_FACTOR))
+        distances, positions = self.index.search(vector, fetch)
+        valid = positions[0] >= 0
+        positions, distances = positions[0][valid], distances[0][valid]
+
+        if self.exact is not None and INDEX_RESCORE_FACTOR:
+            order = np.argsort(positions)
+            candidates = positions[order]
+            exact = np.asarray(self.exact[candidates])
+            distances = ((exact - vector) ** 2).sum(axis=1)
+            positions = candidates
+
+        top = np.argsort(distances, kind="stable")[:k]
+        return positions[top], -distances[top]
+
+    def index_nbytes(self) -> int:
+        return int(faiss.serialize_index(self.index).nbytes)
+
+    def exact_nbytes(self) -> int:
+        return 0 if self.exact is None else int(self.exact.nbytes)
+
+    def nbytes(self) -> int:
+        # 재채점용 float32 원본 벡터까지 포함한 크기
+        return self.index_nbytes() + self.exact_nbytes()
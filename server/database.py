@@ -2,6 +2,7 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from models import Base
 
 
@@ -17,9 +18,23 @@ SessionLocal = sessionmaker(
 )
 
 
+async_engine = create_async_engine("sqlite+aiosqlite:///./data/app.db")
+
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    bind=async_engine
+)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
 
+    # create_all은 이미 있는 테이블에 새로 추가된 인덱스를 만들지 않으므로 따로 확인
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 
 def get_db():
     db = SessionLocal()
@@ -29,5 +44,10 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_db_engine():
     return engine
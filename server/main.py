@@ -1,14 +1,35 @@
 # server/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api import auth, file, manage, chat
-from database import init_db
+from database import init_db, async_engine
+from core.ingestion import INGEST_EAGER_WARMUP, warm_up, shutdown_ingestion
+from core.jobs import start_job_workers, stop_job_workers
+from core.checkpoints import open_checkpointer, close_checkpointer
+from core.segmented_index import start_compactor, stop_compactor
 
 
 init_db()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if INGEST_EAGER_WARMUP:
+        warm_up()
+    await open_checkpointer()
+    start_job_workers()
+    start_compactor()
+    yield
+    stop_compactor()
+    stop_job_workers()
+    shutdown_ingestion()
+    await close_checkpointer()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
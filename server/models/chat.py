@@ -1,6 +1,6 @@
 # server/models/chat.py
 
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from datetime import datetime
 from . import Base
 
@@ -17,6 +17,10 @@ class ChatLog(Base):
     timestamp = Column(DateTime, default=datetime.now)
     context = Column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_chat_logs_session_timestamp", "user", "course", "session_id", "timestamp"),
+    )
+
 
 class SessionTitle(Base):
     __tablename__ = "session_titles"
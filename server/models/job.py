@@ -0,0 +1,25 @@
+# server/models/job.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from . import Base
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user = Column(String, index=True)
+    course = Column(String, index=True)
+    filename = Column(String)
+    path = Column(String)
+    state = Column(String, index=True, default="queued")
+    pages_total = Column(Integer, default=0)
+    pages_done = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    chunks_done = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,108 @@
+# server/tools/index_report.py
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.embedding_cache import embedding_model
+from core.segmented_index import load_course_index
+from core.vector_index import SegmentVectors, build_index, factory_string, truncate
+
+
+CANDIDATES = [
+    ("flat", "float32"),
+    ("flat", "float16"),
+    ("flat", "int8"),
+    ("ivf", "float32"),
+    ("ivf", "int8"),
+    ("ivfpq", "float32"),
+]
+
+
+def live_vectors(user: str, course: str) -> np.ndarray:
+    index = load_course_index(user, course)
+    if index is None or index.ntotal == 0:
+        raise SystemExit(f"{user}/{course}: 인덱스가 없습니다.")
+
+    dimensions = min(segment.vectors.dimensions for segment in index.segments)
+    vectors = []
+    for segment, offset in zip(index.segments, index.offsets):
+        alive = index.alive[offset:offset + segment.ntotal]
+        vectors.append(truncate(segment.vectors.reconstruct_all()[alive], dimensions))
+    return np.concatenate(vectors)
+
+
+def load_queries(vectors: np.ndarray, questions: Path | None, count: int) -> np.ndarray:
+    if questions is not None:
+        texts = [line.strip() for line in questions.read_text(encoding="utf-8").splitlines() if line.strip()]
+        return np.asarray([embedding_model.embed_query(text) for text in texts[:count]], dtype=np.float32)
+    # 질문 파일이 없으면 chunk 벡터에 잡음을 섞어 질문 대신 사용함
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    return truncate(sample + rng.normal(scale=0.01, size=sample.shape).astype(np.float32))
+
+
+def measure(vectors: SegmentVectors, queries: np.ndarray, k: int) -> tuple[list, float]:
+    results = []
+    started = time.perf_counter()
+    for query in queries:
+        positions, _ = vectors.search(query, k)
+        results.append(positions)
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def recall(results: list, truth: list, k: int) -> float:
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="과목 인덱스의 벡터 표현별 메모리, 검색 지연, recall을 비교합니다.")
+    parser.add_argument("user")
+    parser.add_argument("course")
+    parser.add_argument("--dims", default="0", help="비교할 차원 목록 (쉼표 구분, 0은 저장된 차원)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--questions", type=Path, help="한 줄에 질문 하나씩 적힌 파일")
+    args = parser.parse_args()
+
+    vectors = live_vectors(args.user, args.course)
+    queries = load_queries(vectors, args.questions, args.queries)
+    n, stored_dims = vectors.shape
+    print(f"{args.user}/{args.course}: chunk {n}개, 저장 차원 {stored_dims}, 질문 {len(queries)}개, k={args.k}")
+
+    # 기준은 저장된 차원 그대로의 float32 flat 인덱스(완전 탐색) 결과
+    baseline = SegmentVectors(build_index(vectors, "Flat"))
+    truth, _ = measure(baseline, queries, args.k)
+
+    print(
+        f"{'dims':>6} {'index':>20} {'rescore':>7} {'index(MB)':>10} {'exact(MB)':>10} {'total(MB)':>10} "
+        f"{'latency(ms)':>12} {'recall@k':>9}"
+    )
+    for dims in [int(d) for d in args.dims.split(",")]:
+        reduced = truncate(vectors, dims)
+        for index_type, dtype in CANDIDATES:
+            factory = factory_string(n, reduced.shape[1], index_type, dtype, min_vectors=0)
+            try:
+                index = build_index(reduced, factory)
+            except RuntimeError as e:
+                print(f"{reduced.shape[1]:>6} {factory:>20} 생성 실패: {e}")
+                continue
+
+            variants = [(False, SegmentVectors(index))]
+            if factory != "Flat":
+                variants.append((True, SegmentVectors(index, reduced)))
+            for rescore, segment_vectors in variants:
+                results, latency = measure(segment_vectors, queries, args.k)
+                print(
+                    f"{reduced.shape[1]:>6} {factory:>20} {'yes' if rescore else 'no':>7} "
+                    f"{segment_vectors.index_nbytes() / 1024 ** 2:>10.1f} {segment_vectors.exact_nbytes() / 1024 ** 2:>10.1f} "
+                    f"{segment_vectors.nbytes() / 1024 ** 2:>10.1f} {latency:>12.3f} {recall(results, truth, args.k):>9.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()